@@ -0,0 +1,101 @@
+# Arquivo: admin_panel.py
+
+import hmac
+import streamlit as st
+from ai_core import cache_stats, scheduler_stats, instruction_stats
+from metrics import metrics, SERIES, COUNTERS, METRICS_EXPORT_PATH, export_prometheus
+from session_store import blob_store, draft_store, SESSION_MEMORY_LIMIT
+
+# Faixas (em segundos) dos histogramas de tempo do painel
+LATENCY_BOUNDS = [0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16]
+
+
+def is_admin_request():
+    """Painel escondido: só abre com ?admin=<ADMIN_TOKEN>, e só se o token existir no secrets.toml."""
+    token = st.query_params.get("admin")
+    if not token:
+        return False
+    try:
+        expected = st.secrets["ADMIN_TOKEN"]
+    except (KeyError, FileNotFoundError):
+        return False
+    return hmac.compare_digest(str(token), str(expected))
+
+
+def render_admin_page():
+    st.title("📈 Métricas da Oficina")
+    stats = cache_stats()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Acertos do cache de respostas", f"{stats['hit_rate']:.0%}")
+    c2.metric("Acertos em memória / disco", f"{stats['hits_memory']} / {stats['hits_disk']}")
+    c3.metric("Falhas do cache", stats['misses'])
+    queue = scheduler_stats()
+    q1, q2, q3 = st.columns(3)
+    q1.metric("Chamadas na fila agora", queue['queued'])
+    q2.metric("Requisições disponíveis", int(queue['requests_available']))
+    q3.metric("Tokens disponíveis", int(queue['tokens_available']))
+    blobs, drafts = blob_store.stats(), draft_store.stats()
+    sessions = metrics.quantiles("session_bytes", "sessao")
+    s1, s2, s3 = st.columns(3)
+    s1.metric("Memória por sessão (p95)", f"{sessions.get(0.95, 0) / 1024:.0f} KB",
+              help=f"Limite: {SESSION_MEMORY_LIMIT / 1024:.0f} KB por sessão")
+    s2.metric("PDFs em disco", f"{blobs['blobs']} ({blobs['bytes'] / 2**20:.1f} MB)")
+    s3.metric("Rascunhos gravados / pedidos", f"{drafts['rows_written']} / {drafts['saves']}")
+
+    # Só as funções que chamam algo; a medida de memória das sessões está logo acima
+    summary = {tag: entry for tag, entry in metrics.snapshot().items() if entry["calls"]}
+    if not summary:
+        st.info("Nenhuma chamada registrada desde que o servidor subiu.")
+        return
+
+    rows = []
+    for tag, entry in summary.items():
+        quantiles = entry["quantiles"].get("call_seconds", {})
+        calls = entry["calls"] or 1
+        rows.append({
+            "função": tag,
+            "chamadas": int(entry["calls"]),
+            "p50 (s)": round(quantiles.get(0.5, 0.0), 3),
+            "p95 (s)": round(quantiles.get(0.95, 0.0), 3),
+            "p99 (s)": round(quantiles.get(0.99, 0.0), 3),
+            "cache": f"{entry['cache_hits'] / calls:.0%}",
+            "banco local": f"{entry['bank_hits'] / calls:.0%}",
+            "falhas de parser": int(entry["parse_failures"]),
+            "consertos": int(entry["repairs"]),
+            "erros": int(entry["errors"]),
+            "novas tentativas": int(entry["retries"]),
+            "fila p95 (s)": round(entry["quantiles"].get("queue_seconds", {}).get(0.95, 0.0), 3),
+            "deduplicadas": int(entry["deduplicated"]),
+            "tokens do prompt (média)": round(entry["mean"].get("prompt_tokens", 0)),
+            "tokens da resposta (média)": round(entry["mean"].get("response_tokens", 0)),
+            "tokens em cache (média)": round(entry["mean"].get("cached_tokens", 0)),
+        })
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    instructions = instruction_stats()
+    if instructions:
+        modes = {"cache": "cache de contexto", "system": "system instruction", "prefix": "no prompt"}
+        st.caption("Instruções fixas: " + ", ".join(
+            f"{name} ({modes[info['mode']]}, ~{info['instruction_tokens']} tokens)" for name, info in instructions.items()))
+
+    st.subheader("Tempo por chamada (últimas amostras)")
+    tag = st.selectbox("Função", list(summary))
+    labels = [f"≤ {bound}s" for bound in LATENCY_BOUNDS] + [f"> {LATENCY_BOUNDS[-1]}s"]
+    counts = metrics.histogram("call_seconds", tag, LATENCY_BOUNDS)
+    st.bar_chart({"chamadas": dict(zip(labels, counts))})
+    if summary[tag]["quantiles"].get("first_chunk_seconds"):
+        st.caption("Tempo até o primeiro pedaço (streaming)")
+        st.bar_chart({"chamadas": dict(zip(labels, metrics.histogram("first_chunk_seconds", tag, LATENCY_BOUNDS)))})
+
+    with st.expander("O que cada coluna mede"):
+        for name, description in {**COUNTERS, **SERIES}.items():
+            st.markdown(f"- `{name}`: {description}")
+
+    text = metrics.prometheus_text()
+    col_download, col_export = st.columns(2)
+    col_download.download_button("Baixar no formato do Prometheus", data=text, file_name="metricas.prom", mime="text/plain")
+    if col_export.button("Gravar arquivo agora"):
+        export_prometheus()
+        st.toast(f"Métricas gravadas em {METRICS_EXPORT_PATH}")
+    if st.button("Zerar métricas"):
+        metrics.reset()
+        st.rerun()
@@ -1,16 +1,785 @@
 # Arquivo: ai_core.py
 
-import google.generativeai as genai
 import streamlit as st
+import ast
+import atexit
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from metrics import metrics
+
+CACHE_PATH = os.environ.get(
+    "OFICINA_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "respostas_ia.sqlite3"),
+)
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_MAX_MEMORY_ENTRIES = 256
+CACHE_MAX_DISK_ENTRIES = 5000
+# Quantas vezes uma resposta fora do esquema volta para a IA consertar antes de desistir
+MAX_REPAIR_ATTEMPTS = 1
+
+# Limites da cota do projeto no Gemini, compartilhados por todas as sessões do processo
+REQUESTS_PER_MINUTE = int(os.environ.get("OFICINA_REQUESTS_PER_MINUTE", "150"))
+TOKENS_PER_MINUTE = int(os.environ.get("OFICINA_TOKENS_PER_MINUTE", "1000000"))
+ESTIMATED_RESPONSE_TOKENS = 500  # reserva por chamada; acertada com o usage_metadata depois
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 20.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Prioridades da fila (menor passa na frente)
+PRIORITY_INTERACTIVE = 0  # o aluno está esperando na tela (rimas, revisão)
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2  # busca adiantada (prefetch)
+_INTERACTIVE_TAGS = {"rhymes", "spell"}
+
+# Instruções fixas de cada função, enviadas como system instruction (e guardadas no cache de contexto da API)
+PROMPT_CACHE_TTL_SECONDS = 60 * 60
+PROMPT_CACHE_MIN_TOKENS = 1024  # abaixo disso a API recusa o cache de contexto; nem tenta
+
+_model = None
+_model_lock = threading.Lock()
+
 
 def configure_ai():
-    """Configura e retorna o modelo de IA."""
+    """Configura e retorna o modelo de IA (criado uma única vez por processo e compartilhado)."""
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            api_key = _api_key()
+            if api_key is None:
+                # Fora de uma tela do app (lote, benchmarks) quem chamou avisa uma vez; st.error aqui
+                # só encheria o terminal de avisos a cada chamada
+                if get_script_run_ctx(suppress_warning=True) is not None:
+                    st.error("Chave da API do Google AI não encontrada. Verifique o arquivo secrets.toml.")
+                return None
+            # O SDK leva meio segundo para importar: só carrega na primeira chamada (ou no warm_up)
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _model = genai.GenerativeModel('gemini-2.5-flash')
+    return _model
+
+
+def _api_key():
     try:
-        api_key = st.secrets["GOOGLE_API_KEY"]
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        return model
+        return st.secrets["GOOGLE_API_KEY"]
     except (KeyError, FileNotFoundError):
-        st.error("Chave da API do Google AI não encontrada. Verifique o arquivo secrets.toml.")
         return None
 
+
+def has_api_key():
+    """Diz se há chave da IA no secrets.toml, sem mostrar erro na tela."""
+    return _api_key() is not None
+
+
+_warm_up_started = False
+
+
+def warm_up():
+    """Importa o SDK da IA numa thread, depois que a primeira tela já apareceu."""
+    global _warm_up_started
+    if _warm_up_started:
+        return
+    _warm_up_started = True
+    threading.Thread(target=lambda: __import__("google.generativeai"), name="oficina-warm-up", daemon=True).start()
+
+
+class InstructedModel:
+    """Modelo com as instruções fixas de uma função; o prompt de cada chamada leva só a parte que varia.
+
+    mode diz como as instruções chegam à IA:
+    - "cache": cache de contexto da API (genai.caching), enviadas e cobradas por inteiro uma vez só;
+    - "system": system_instruction de um GenerativeModel, sem o desconto do cache;
+    - "prefix": substituto local para modelos que não aceitam instruções (ex.: o modelo falso dos
+      benchmarks), que recebem as instruções na frente do prompt.
+    """
+
+    def __init__(self, base, model, instruction, mode, expires=None, cached_content=None):
+        self.base = base
+        self.model = model
+        self.instruction = instruction
+        self.mode = mode
+        self.expires = expires
+        self.cached_content = cached_content
+        # Entra na chave do cache de respostas: o mesmo prompt com outras instruções é outra pergunta
+        digest = hashlib.sha256(instruction.encode("utf-8")).hexdigest()[:12]
+        self.model_name = f"{base.model_name}#{digest}"
+
+    def generate_content(self, contents, **kwargs):
+        if self.mode == "prefix":
+            contents = f"{self.instruction}\n\n{contents}"
+        return self.model.generate_content(contents, **kwargs)
+
+
+_instructed = {}
+_instructed_lock = threading.Lock()
+
+
+def instruction_model(name, instruction):
+    """O modelo da função 'name' com as suas instruções fixas, criado uma vez por processo (None sem chave)."""
+    base = configure_ai()
+    if base is None:
+        return None
+    with _instructed_lock:
+        model = _instructed.get(name)
+        if model is None or model.base is not base or (model.expires and time.time() >= model.expires):
+            model = _instructed[name] = _create_instructed(base, name, instruction)
+    return model
+
+
+def _create_instructed(base, name, instruction):
+    import google.generativeai as genai
+    if not isinstance(base, genai.GenerativeModel):
+        return InstructedModel(base, base, instruction, "prefix")
+    if len(instruction) // 4 >= PROMPT_CACHE_MIN_TOKENS:
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=base.model_name, display_name=f"oficina-{name}",
+                system_instruction=instruction, ttl=timedelta(seconds=PROMPT_CACHE_TTL_SECONDS),
+            )
+            # Renova um minuto antes de a API apagar o conteúdo
+            return InstructedModel(base, genai.GenerativeModel.from_cached_content(cached), instruction, "cache",
+                                   expires=time.time() + PROMPT_CACHE_TTL_SECONDS - 60, cached_content=cached)
+        except Exception:
+            pass  # conta sem o recurso ou modelo sem suporte: segue com system_instruction
+    return InstructedModel(base, genai.GenerativeModel(base.model_name, system_instruction=instruction),
+                           instruction, "system")
+
+
+@atexit.register
+def _delete_cached_contents():
+    # O armazenamento do cache de contexto é cobrado por hora: não deixa nada para trás
+    for model in list(_instructed.values()):
+        if model.cached_content is not None:
+            try:
+                model.cached_content.delete()
+            except Exception:
+                pass
+
+
+def instruction_stats():
+    """Por função: como as instruções chegam à IA e o tamanho estimado delas em tokens."""
+    with _instructed_lock:
+        return {name: {"mode": model.mode, "instruction_tokens": len(model.instruction) // 4}
+                for name, model in _instructed.items()}
+
+
+class ResponseCache:
+    """Cache de respostas da IA em dois níveis: LRU em memória e SQLite em disco."""
+
+    def __init__(self, path, max_memory_entries, max_disk_entries, ttl_seconds):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def make_key(model_name, prompt, generation_config=None):
+        """Chave = modelo + prompt normalizado + configuração (inclui a temperatura)."""
+        payload = {
+            "model": model_name,
+            "prompt": re.sub(r"\s+", " ", prompt).strip(),
+            "config": dict(generation_config or {}),
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        return self._db
+
+    def _remember(self, key, value, created):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry and now - entry[1] < self.ttl_seconds:
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry[0]
+            self.memory.pop(key, None)
+            try:
+                db = self._connection()
+                row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl_seconds:
+                    db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits_disk += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+            except sqlite3.Error:
+                pass  # Sem disco o cache continua funcionando só em memória
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            try:
+                db = self._connection()
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now, now))
+                db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+                db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            try:
+                db = self._connection()
+                db.execute("DELETE FROM responses")
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        total = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / total if total else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+response_cache = ResponseCache(CACHE_PATH, CACHE_MAX_MEMORY_ENTRIES, CACHE_MAX_DISK_ENTRIES, CACHE_TTL_SECONDS)
+
+
+class _Ticket:
+    """Lugar na fila do agendador; a prioridade pode subir enquanto espera."""
+
+    __slots__ = ("priority", "seq")
+    _counter = itertools.count()
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.seq = next(self._counter)
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Scheduler:
+    """Fila de prioridade com dois baldes de fichas: requisições e tokens por minuto.
+
+    Um só por processo: todas as sessões do Streamlit passam por ele antes de chamar a IA.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.request_capacity = requests_per_minute
+        self.token_capacity = tokens_per_minute
+        self.requests = float(requests_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._queue = []
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        self.requests = min(self.request_capacity, self.requests + elapsed * self.request_capacity / 60)
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_capacity / 60)
+
+    def _seconds_until(self, tokens):
+        missing_requests = max(0.0, 1 - self.requests) * 60 / self.request_capacity
+        missing_tokens = max(0.0, tokens - self.tokens) * 60 / self.token_capacity
+        return max(missing_requests, missing_tokens)
+
+    def acquire(self, ticket, tokens):
+        """Espera a vez na fila e as fichas; devolve quantos segundos esperou."""
+        tokens = min(tokens, self.token_capacity)
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            while True:
+                self._refill()
+                if self._queue[0] is ticket:
+                    wait = self._seconds_until(tokens)
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests -= 1
+                        self.tokens -= tokens
+                        self._cond.notify_all()
+                        return time.monotonic() - start
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+    def promote(self, ticket, priority):
+        """Sobe a prioridade de quem já está na fila (ex.: um aluno passou a esperar pelo prefetch)."""
+        with self._cond:
+            if priority < ticket.priority:
+                ticket.priority = priority
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def settle(self, estimated, actual):
+        """Acerta o balde de tokens com o uso informado pela API."""
+        if actual is None:
+            return
+        with self._cond:
+            self.tokens -= actual - min(estimated, self.token_capacity)
+
+    def throttle(self):
+        """Depois de um 429, segura todo mundo até a próxima ficha."""
+        with self._cond:
+            self._refill()
+            self.requests = min(self.requests, 0.0)
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {"queued": len(self._queue), "requests_available": self.requests, "tokens_available": self.tokens}
+
+
+scheduler = Scheduler(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+_priority = contextvars.ContextVar("oficina_priority", default=None)
+
+
+@contextmanager
+def background_priority():
+    """Chamadas feitas dentro deste bloco esperam atrás das interativas."""
+    token = _priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _current_priority(tag):
+    priority = _priority.get()
+    if priority is not None:
+        return priority
+    return PRIORITY_INTERACTIVE if tag in _INTERACTIVE_TAGS else PRIORITY_NORMAL
+
+
+def _is_retryable(error):
+    return getattr(error, "code", None) in RETRYABLE_STATUS
+
+
+def _backoff_delay(attempt):
+    """Espera exponencial com variação aleatória ("full jitter"), para a turma não voltar junta."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _estimate_tokens(model, prompt):
+    # As instruções fixas também contam na cota de tokens, mesmo quando vêm do cache de contexto
+    return (len(prompt) + len(getattr(model, "instruction", ""))) // 4 + ESTIMATED_RESPONSE_TOKENS
+
+
+class _Flight:
+    """Uma chamada em andamento; sessões com o mesmo prompt esperam por ela em vez de repeti-la."""
+
+    def __init__(self, ticket):
+        self.ticket = ticket
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _join_flight(key, priority):
+    """Devolve (voo, True) para quem vai chamar a IA, ou (voo existente, False) para quem espera."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = _Flight(_Ticket(priority))
+            return flight, True
+    scheduler.promote(flight.ticket, priority)
+    return flight, False
+
+
+def _land_flight(key, flight, text=None, error=None):
+    with _flights_lock:
+        _flights.pop(key, None)
+    flight.text, flight.error = text, error
+    flight.done.set()
+
+
+def _await_flight(flight, prompt, tag, start):
+    flight.done.wait()
+    if flight.error is not None:
+        raise flight.error
+    metrics.increment("deduplicated", tag)
+    metrics.record_call(tag, time.perf_counter() - start, prompt_chars=len(prompt), response_chars=len(flight.text))
+    return flight.text
+
+
+def generate(model, prompt, generation_config=None, parser=None, use_cache=True, tag="outros", schema=None):
+    """Chama o modelo passando pelo cache compartilhado e devolve o texto (ou o resultado do parser).
+
+    Só respostas que o parser aceita são guardadas; use_cache=False força uma resposta
+    nova, para chamadas com temperatura alta em que a variedade importa mais que o reuso.
+    'tag' identifica a função que chamou (rhymes, spell, themes...) nas métricas.
+    Com 'schema', a IA responde em JSON nesse formato; o JSON é extraído e validado antes
+    do parser, e uma resposta fora do esquema volta para conserto até MAX_REPAIR_ATTEMPTS vezes.
+    A chamada passa pelo agendador do processo, e prompts idênticos em andamento em outra
+    sessão são esperados em vez de repetidos.
+    """
+    parse = parser or (lambda text: text)
+    if schema is not None:
+        generation_config = json_config(generation_config, schema)
+        parse = _schema_parser(schema, parser)
+    start = time.perf_counter()
+    key = ResponseCache.make_key(model.model_name, prompt, generation_config)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            result = _parse_tracked(parse, cached, tag)
+            metrics.record_call(tag, time.perf_counter() - start, cache_hit=True,
+                                prompt_chars=len(prompt), response_chars=len(cached))
+            return result
+        flight, leader = _join_flight(key, _current_priority(tag))
+        if not leader:
+            return _parse_tracked(parse, _await_flight(flight, prompt, tag, start), tag)
+        ticket = flight.ticket
+    else:
+        flight, ticket = None, _Ticket(_current_priority(tag))
+    try:
+        text = _call_model(model, prompt, generation_config, tag, start, ticket)
+        attempt = 0
+        while True:
+            try:
+                result = _parse_tracked(parse, text, tag)
+                break
+            except ValueError as e:
+                if schema is None or attempt >= MAX_REPAIR_ATTEMPTS:
+                    raise
+                attempt += 1
+                metrics.increment("repairs", tag)
+                # O conserto do JSON vai sem as instruções da função: é outra tarefa
+                text = _call_model(getattr(model, "base", model), _repair_prompt(text, schema, e), generation_config,
+                                   tag, time.perf_counter(), ticket)
+    except BaseException as e:
+        if flight is not None:
+            _land_flight(key, flight, error=e)
+        raise
+    if use_cache:
+        response_cache.set(key, text)
+        _land_flight(key, flight, text=text)
+    return result
+
+
+def _call_model(model, prompt, generation_config, tag, start, ticket):
+    """Uma chamada à IA pelo agendador, com novas tentativas (espera exponencial) em 429/5xx."""
+    estimated = _estimate_tokens(model, prompt)
+    for attempt in range(MAX_RETRIES + 1):
+        metrics.observe("queue_seconds", tag, scheduler.acquire(ticket, estimated))
+        try:
+            response = model.generate_content(prompt, generation_config=generation_config)
+            text = response.text
+            break
+        except Exception as e:
+            _handle_failure(e, attempt, tag)
+    usage = getattr(response, "usage_metadata", None)
+    scheduler.settle(estimated, getattr(usage, "total_token_count", None))
+    metrics.record_call(tag, time.perf_counter() - start, prompt_chars=len(prompt), response_chars=len(text), usage=usage)
+    return text
+
+
+def _handle_failure(error, attempt, tag):
+    """Registra a falha; relança se não vale tentar de novo, senão espera a vez da nova tentativa."""
+    metrics.increment("errors", tag)
+    if attempt >= MAX_RETRIES or not _is_retryable(error):
+        raise error
+    if getattr(error, "code", None) == 429:
+        scheduler.throttle()
+    metrics.increment("retries", tag)
+    time.sleep(_backoff_delay(attempt))
+
+
+def _open_stream(model, prompt, generation_config, tag, ticket):
+    """Abre o streaming pelo agendador; tenta de novo só enquanto nenhum pedaço chegou."""
+    estimated = _estimate_tokens(model, prompt)
+    for attempt in range(MAX_RETRIES + 1):
+        metrics.observe("queue_seconds", tag, scheduler.acquire(ticket, estimated))
+        try:
+            stream = iter(model.generate_content(prompt, generation_config=generation_config, stream=True))
+            first = next(stream, None)
+            break
+        except Exception as e:
+            _handle_failure(e, attempt, tag)
+    return (stream if first is None else itertools.chain([first], stream)), estimated
+
+
+def _parse_tracked(parse, text, tag):
+    try:
+        return parse(text)
+    except Exception:
+        metrics.increment("parse_failures", tag)
+        raise
+
+
+def _repair_prompt(text, schema, error):
+    return f"""
+    A resposta abaixo deveria ser um JSON que segue este esquema, mas está com problema ({error}).
+    Esquema: {json.dumps(schema, ensure_ascii=False)}
+    Resposta recebida:
+    ---
+    {text[:4000]}
+    ---
+    Retorne APENAS o JSON corrigido, com o mesmo conteúdo.
+    """
+
+
+def cache_stats():
+    """Contadores de acertos e falhas do cache de respostas."""
+    return response_cache.stats()
+
+
+def scheduler_stats():
+    """Fila e fichas disponíveis no agendador de chamadas."""
+    return scheduler.stats()
+
+
+def generate_stream(model, prompt, generation_config=None, parser=None, use_cache=True, tag="outros", schema=None):
+    """Versão em streaming de generate(): devolve os pedaços de texto conforme a IA escreve.
+
+    Numa resposta já em cache, o texto inteiro sai de uma vez. A resposta completa só
+    entra no cache se o parser aceitar o texto final (e, com 'schema', se seguir o esquema).
+    Não há conserto no streaming: os itens já foram mostrados. Se outra sessão já está
+    recebendo o mesmo prompt, o texto vem inteiro quando ela terminar.
+    """
+    if schema is not None:
+        generation_config = json_config(generation_config, schema)
+        parser = _schema_parser(schema, parser)
+    start = time.perf_counter()
+    key = ResponseCache.make_key(model.model_name, prompt, generation_config)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            metrics.record_call(tag, time.perf_counter() - start, cache_hit=True,
+                                prompt_chars=len(prompt), response_chars=len(cached))
+            yield cached
+            return
+        flight, leader = _join_flight(key, _current_priority(tag))
+        if not leader:
+            yield _await_flight(flight, prompt, tag, start)
+            return
+        ticket = flight.ticket
+    else:
+        flight, ticket = None, _Ticket(_current_priority(tag))
+    parts, usage, text = [], None, None
+    try:
+        chunks, estimated = _open_stream(model, prompt, generation_config, tag, ticket)
+        try:
+            for chunk in chunks:
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    continue  # pedaço sem texto (ex.: só metadados de segurança)
+                if not parts:
+                    metrics.observe("first_chunk_seconds", tag, time.perf_counter() - start)
+                parts.append(piece)
+                yield piece
+        except Exception:
+            metrics.increment("errors", tag)
+            raise
+        text = "".join(parts)
+        scheduler.settle(estimated, getattr(usage, "total_token_count", None))
+        metrics.record_call(tag, time.perf_counter() - start, prompt_chars=len(prompt), response_chars=len(text), usage=usage)
+        if use_cache:
+            _parse_tracked(parser or (lambda t: t), text, tag)
+            response_cache.set(key, text)
+    except BaseException as e:
+        if flight is not None:
+            if text is not None:
+                _land_flight(key, flight, text=text)  # texto completo, só não passou no parser
+            else:
+                _land_flight(key, flight, error=e if isinstance(e, Exception) else RuntimeError("streaming interrompido"))
+        if text is not None and isinstance(e, Exception):
+            return
+        raise
+    if flight is not None:
+        _land_flight(key, flight, text=text)
+
+
+def json_config(generation_config, schema):
+    """Configuração que pede à IA uma resposta em JSON seguindo o esquema (formato OpenAPI do Gemini)."""
+    return dict(generation_config or {}, response_mime_type="application/json", response_schema=schema)
+
+
+def _schema_parser(schema, parser=None):
+    def parse(text):
+        value = validate(extract_json(text), schema)
+        return parser(value) if parser else value
+    return parse
+
+
+_json_decoder = json.JSONDecoder()
+
+
+def extract_json(text):
+    """Extrai o primeiro valor JSON da resposta numa passada só.
+
+    Ignora cercas de markdown e texto em volta. Listas no estilo Python ('texto')
+    são lidas com ast.literal_eval, nunca com eval(). Erros viram ValueError.
+    """
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if not starts:
+        raise ValueError("resposta sem JSON")
+    start = min(starts)
+    try:
+        return _json_decoder.raw_decode(text, start)[0]
+    except ValueError:
+        pass
+    end = _closing_bracket(text, start)
+    if end is None:
+        raise ValueError("JSON incompleto")
+    try:
+        return ast.literal_eval(text[start:end + 1])
+    except (ValueError, SyntaxError) as e:
+        raise ValueError(f"JSON inválido: {e}") from None
+
+
+def _closing_bracket(text, start):
+    depth, quote, escaped = 0, None, False
+    for pos in range(start, len(text)):
+        c = text[pos]
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == quote:
+                quote = None
+        elif c in "'\"":
+            quote = c
+        elif c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+            if depth == 0:
+                return pos
+    return None
+
+
+_SCHEMA_TYPES = {"array": list, "object": dict, "string": str, "integer": int, "number": (int, float), "boolean": bool}
+
+
+def validate(value, schema, path="resposta"):
+    """Confere o valor contra o esquema (type, items, properties, required, enum, min_items) e o devolve."""
+    expected = schema.get("type", "").lower()
+    if expected and (not isinstance(value, _SCHEMA_TYPES[expected]) or (expected in ("integer", "number") and isinstance(value, bool))):
+        raise ValueError(f"{path}: esperava {expected}, veio {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"{path}: {value!r} não é uma opção válida")
+    if expected == "array":
+        if len(value) < schema.get("min_items", 0):
+            raise ValueError(f"{path}: poucos itens ({len(value)})")
+        for i, item in enumerate(value):
+            validate(item, schema.get("items", {}), f"{path}[{i}]")
+    elif expected == "object":
+        for name in schema.get("required", ()):
+            if name not in value:
+                raise ValueError(f"{path}: falta '{name}'")
+        for name, subschema in schema.get("properties", {}).items():
+            if name in value:
+                validate(value[name], subschema, f"{path}.{name}")
+    return value
+
+
+def _parse_list_item(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return ast.literal_eval(text)  # itens no estilo Python ('texto', {'chave': ...}), sem eval()
+
+
+def iter_list_items(chunks):
+    """Lê uma lista JSON (ou Python) em pedaços e devolve cada item assim que ele fecha.
+
+    Serve para objetos e strings no primeiro nível da lista; texto antes do '[' (como
+    cercas de markdown) é ignorado. Itens que não dão para interpretar são pulados.
+    """
+    buffer, pos, depth, start = "", 0, 0, None
+    quote, escaped, closed = None, False, False
+    for chunk in chunks:
+        if closed:
+            continue  # lê o resto para a resposta terminar (e entrar no cache e nas métricas)
+        buffer += chunk
+        while pos < len(buffer):
+            c = buffer[pos]
+            if quote:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == quote:
+                    quote = None
+                    if depth == 1 and start is not None:
+                        item, start = buffer[start:pos + 1], None
+                        try:
+                            yield _parse_list_item(item)
+                        except (ValueError, SyntaxError):
+                            pass
+            elif depth == 0:
+                if c == "[":
+                    depth = 1
+            elif c in "'\"":
+                quote = c
+                if depth == 1:
+                    start = pos
+            elif c in "[{":
+                depth += 1
+                if depth == 2:
+                    start = pos
+            elif c in "]}":
+                depth -= 1
+                if depth == 0:
+                    closed = True
+                    break
+                if depth == 1 and start is not None:
+                    item, start = buffer[start:pos + 1], None
+                    try:
+                        yield _parse_list_item(item)
+                    except (ValueError, SyntaxError):
+                        pass
+            pos += 1
@@ -2,10 +2,16 @@
 
 import streamlit as st
 import re
-from theme_generator import generate_themes, generate_progression_ideas
-from rhyme_engine import get_ai_rhymes
-from spell_checker import find_errors
-from pdf_generator import create_poem_pdf, generate_pdf_style
+from theme_generator import stream_themes, generate_progression_ideas
+from rhyme_engine import stream_ai_rhymes, find_local_rhymes, get_poem_rhymes, rhyme_scheme
+from spell_checker import find_errors, apply_suggestion
+from meter import analyze_poem, metre_name
+from prefetch import start_theme_prefetch, cancel_prefetch, await_task, ready_result, await_rhymes, has_prefetched_rhymes
+from admin_panel import is_admin_request, render_admin_page
+from ai_core import warm_up
+from session_store import blob_store, draft_store, claim_draft_id, enforce_session_limit
+from metrics import maybe_export
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from collections import defaultdict
 
 st.set_page_config(layout="wide", page_title="Oficina de Rimas")
@@ -40,30 +46,201 @@ if 'app_stage' not in st.session_state:
     st.session_state.poem_text = ""
     st.session_state.rhymes = None
     st.session_state.rhyme_word = ""
+    st.session_state.poem_rhymes = None
     st.session_state.spell_errors = []
     st.session_state.theme_suggestions = []
-    st.session_state.pdf_data = None
+    st.session_state.pdf_handle = None  # o PDF fica no disco (blob_store); a sessão guarda só o handle
     st.session_state.pdf_filename = ""
+    st.session_state.prefetch = None
+    # O id do rascunho fica na URL: recarregando a página (ou depois de o servidor reiniciar) o poema volta.
+    # Uma URL copiada de quem ainda está com o app aberto ganha um rascunho novo.
+    ctx = get_script_run_ctx()
+    st.session_state.draft_id = claim_draft_id(st.query_params.get("rascunho"), ctx.session_id if ctx else None)
+    st.query_params["rascunho"] = st.session_state.draft_id
+    draft = draft_store.load(st.session_state.draft_id)
+    if draft and draft[1]:
+        st.session_state.poem_text, st.session_state.chosen_theme = draft
+        st.session_state.app_stage = 'writing_poem'
+
+enforce_session_limit(st.session_state)
+# Só o processo do app grava o arquivo de métricas do servidor (no máximo a cada 15 s)
+maybe_export()
+
+# Painel de métricas de quem opera o servidor (escondido: abre com ?admin=<ADMIN_TOKEN>)
+if is_admin_request():
+    render_admin_page()
+    st.stop()
 
 def get_poem_stats(text):
-    verses = [line for line in text.split('\n') if line.strip()]
-    stanzas = [stanza for stanza in text.split('\n\n') if stanza.strip()]
-    return len(verses), len(stanzas)
+    """Versos, estrofes, escansão, métrica e esquema de rimas; tudo local, só os versos editados são recalculados."""
+    return analyze_poem(text)
+
+def rhyme_list_html(rhymes):
+    rhyme_html = "<div class='rhyme-list'>"
+    for rhyme in rhymes:
+        if rhyme['definicao']:
+            rhyme_html += f"<div><b>{rhyme['palavra']}:</b> <i>{rhyme['definicao']}</i></div>"
+        else:
+            rhyme_html += f"<div><b>{rhyme['palavra']}</b></div>"
+    rhyme_html += "</div>"
+    return rhyme_html
+
+def stream_rhymes(placeholder, word, theme, known=None):
+    """Mostra as rimas da IA no placeholder conforme chegam e devolve a lista completa."""
+    rhymes = {r.lower(): {"palavra": r, "definicao": ""} for r in known or []}
+    for rhyme in stream_ai_rhymes(word, theme, known):
+        rhymes[rhyme['palavra'].lower()] = rhyme
+        placeholder.markdown(rhyme_list_html(list(rhymes.values())), unsafe_allow_html=True)
+    return list(rhymes.values())
 
-def apply_correction(original, suggestion):
+def apply_correction(error, suggestion):
     """Substitui uma palavra errada pela sugestão escolhida."""
-    def replace_word(match):
-        word = match.group(0)
-        if word.isupper():
-            return suggestion.upper()
-        elif word.istitle():
-            return suggestion.title()
+    # A correção é aplicada só no verso do erro e a lista é atualizada localmente, sem nova revisão da IA
+    st.session_state.poem_text, st.session_state.spell_errors = apply_suggestion(
+        st.session_state.poem_text, st.session_state.spell_errors, error, suggestion
+    )
+    # Roda no callback, antes do editor ser desenhado: é o único momento em que dá para mudar o texto dele
+    st.session_state.poem_editor = st.session_state.poem_text
+    save_draft()
+
+def sync_poem_text():
+    """Copia o texto do editor para poem_text só quando o aluno edita o poema."""
+    st.session_state.poem_text = st.session_state.poem_editor
+    save_draft()
+
+def save_draft():
+    # Vai para a fila do draft_store: várias edições seguidas viram uma gravação só no SQLite
+    draft_store.save(st.session_state.draft_id, st.session_state.poem_text, st.session_state.chosen_theme)
+
+def poem_editor():
+    # O editor guarda o próprio texto pela key: sem value=, o poema não vai e volta a cada clique em outro lugar
+    if "poem_editor" not in st.session_state:
+        st.session_state.poem_editor = st.session_state.poem_text
+    st.text_area("Seu Poema", height=450, key="poem_editor", label_visibility="collapsed", on_change=sync_poem_text)
+
+# Cada painel abaixo é um fragmento: um clique dentro dele roda de novo só aquele painel, não a página toda.
+
+@st.fragment
+def poem_workspace():
+    """Editor e estatísticas juntos: editar o poema atualiza só os dois."""
+    with st.container(border=True):
+        st.subheader("Escreva seu poema aqui")
+        poem_editor()
+    poem_stats_panel()
+
+def poem_stats_panel():
+    with st.container(border=True):
+        st.subheader("📊 Estatísticas do Poema")
+        stats = get_poem_stats(st.session_state.poem_text)
+        c1, c2 = st.columns(2)
+        c1.metric("Versos", stats.verses)
+        c2.metric("Estrofes", stats.stanzas)
+        if stats.metre:
+            name = metre_name(stats.metre)
+            st.caption(f"Métrica mais comum: **{stats.metre} sílabas poéticas**" + (f" ({name})" if name else ""))
+        if stats.schemes:
+            st.caption(f"Esquema de rimas: **{' '.join(stats.schemes)}**")
+        if stats.lines:
+            with st.expander("Sílabas de cada verso"):
+                for number, verse in stats.lines:
+                    stresses = ", ".join(str(s) for s in verse.stresses)
+                    st.markdown(f"**{number}.** {verse.syllables} sílabas (tônicas: {stresses})")
+
+@st.fragment
+def rhyme_finder():
+    with st.container(border=True):
+        st.subheader("🔎 Caça-Rimas")
+        rhyme_word_input = st.text_input("Digite uma palavra para rimar:", key="rhyme_input")
+        if st.button("Buscar Rimas"):
+            if rhyme_word_input:
+                st.session_state.rhyme_word = rhyme_word_input
+                # O índice local responde na hora; a IA só entra se a palavra for desconhecida
+                local_rhymes = find_local_rhymes(rhyme_word_input)
+                st.session_state.rhymes = [{"palavra": r, "definicao": ""} for r in local_rhymes]
+                if not local_rhymes:
+                    with st.spinner(f"Buscando rimas para '{rhyme_word_input}'..."):
+                        streaming_area = st.empty()
+                        st.session_state.rhymes = stream_rhymes(streaming_area, rhyme_word_input, st.session_state.chosen_theme)
+                    streaming_area.empty()
+            else:
+                st.toast("Digite uma palavra!", icon="❗️")
+
+        if st.session_state.rhymes:
+            st.markdown(f"**Rimas para '{st.session_state.rhyme_word}':**")
+            if "Erro" in st.session_state.rhymes[0]['palavra']:
+                st.warning(st.session_state.rhymes[0]['definicao'])
+            else:
+                rhyme_area = st.empty()
+                rhyme_area.markdown(rhyme_list_html(st.session_state.rhymes), unsafe_allow_html=True)
+
+                if not all(rhyme['definicao'] for rhyme in st.session_state.rhymes):
+                    if st.button("📖 Ver significados e rimas do tema"):
+                        with st.spinner("O Assistente está explicando as rimas..."):
+                            known = [rhyme['palavra'] for rhyme in st.session_state.rhymes]
+                            if has_prefetched_rhymes(st.session_state.prefetch, st.session_state.rhyme_word):
+                                st.session_state.rhymes = await_rhymes(st.session_state.prefetch, st.session_state.rhyme_word, st.session_state.chosen_theme, known)
+                            else:
+                                st.session_state.rhymes = stream_rhymes(rhyme_area, st.session_state.rhyme_word, st.session_state.chosen_theme, known)
+                        st.rerun(scope="fragment")
+
+        st.markdown("---")
+        if st.button("🎯 Rimas para todos os versos", help="Busca de uma vez as rimas da última palavra de cada verso."):
+            if st.session_state.poem_text.strip():
+                with st.spinner("O Assistente está buscando rimas para o poema todo..."):
+                    st.session_state.poem_rhymes = get_poem_rhymes(st.session_state.poem_text, st.session_state.chosen_theme)
+            else:
+                st.toast("Escreva alguns versos primeiro!", icon="❗️")
+
+        if st.session_state.poem_rhymes:
+            schemes = rhyme_scheme(st.session_state.poem_text)
+            if schemes:
+                st.caption(f"Esquema de rimas: **{' '.join(schemes)}**")
+            for word, rhymes in st.session_state.poem_rhymes.items():
+                with st.expander(f"Rimas para '{word}'"):
+                    if rhymes:
+                        st.markdown(rhyme_list_html(rhymes), unsafe_allow_html=True)
+                    else:
+                        st.caption("Nenhuma rima encontrada para esta palavra.")
+
+@st.fragment
+def review_workspace():
+    """Editor e dicas num fragmento só: aplicar uma correção redesenha os dois, e nada mais da página."""
+    col_editor, col_corrections = st.columns(2)
+
+    with col_editor:
+        st.subheader("Seu Poema (Editável)")
+        poem_editor()
+
+    with col_corrections:
+        st.subheader("Dicas do Assistente")
+        if st.button("🔄 Revisar de novo", help="Só os versos que você mudou voltam para o Assistente."):
+            with st.spinner("O Assistente está revisando os versos alterados..."):
+                st.session_state.spell_errors = find_errors(st.session_state.poem_text)
+        if not st.session_state.spell_errors:
+            st.success("Nenhum problema encontrado! Seu poema está ótimo. 🎉")
         else:
-            return suggestion.lower()
-    
-    st.session_state.poem_text = re.sub(r'\b' + re.escape(original) + r'\b', replace_word, st.session_state.poem_text, count=1, flags=re.IGNORECASE)
-    # Após a correção, re-analisa o texto para remover o erro da lista
-    st.session_state.spell_errors = find_errors(st.session_state.poem_text)
+            errors_by_verse = defaultdict(list)
+            for error in st.session_state.spell_errors:
+                errors_by_verse[error['verse_number']].append(error)
+
+            st.markdown("<div class='correction-list'>", unsafe_allow_html=True)
+            for verse_num, errors in sorted(errors_by_verse.items()):
+                st.markdown(f"<div class='correction-verse'>", unsafe_allow_html=True)
+                st.markdown(f"**No Verso {verse_num}:**")
+                for error in errors:
+                    st.write(f"Problema: **`{error['original']}`**")
+
+                    cols = st.columns(len(error['suggestions']))
+                    for i, suggestion in enumerate(error['suggestions']):
+                        cols[i].button(
+                            suggestion,
+                            key=f"corr_{verse_num}_{error['original']}_{suggestion}",
+                            on_click=apply_correction,
+                            args=(error, suggestion)
+                        )
+                    st.caption(f"Motivo: {error['reason']}")
+                st.markdown(f"</div>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
 
 # --- ROTEAMENTO DA APLICAÇÃO ---
 
@@ -76,12 +253,20 @@ if st.session_state.app_stage == 'getting_interest':
         if st.button("Gerar Ideias de Temas →", type="primary"):
             if interest:
                 st.session_state.interest_text = interest
+                # Os temas aparecem um a um, assim que a IA termina de escrever cada um
+                themes_area = st.empty()
+                themes = []
                 with st.spinner("O Assistente está criando temas com a sua cara..."):
-                    st.session_state.generated_themes = generate_themes(st.session_state.interest_text)
+                    for theme in stream_themes(st.session_state.interest_text):
+                        themes.append(theme)
+                        themes_area.markdown("\n".join(f"- ✨ {t}" for t in themes))
+                st.session_state.generated_themes = themes
                 st.session_state.app_stage = 'choosing_theme'
                 st.rerun()
             else:
                 st.warning("Escreva algo que você gosta para a gente começar!")
+    # A tela já foi desenhada: o SDK da IA carrega em segundo plano enquanto o aluno escreve
+    warm_up()
 
 # ETAPA 2: Escolha do Tema
 elif st.session_state.app_stage == 'choosing_theme':
@@ -96,13 +281,18 @@ elif st.session_state.app_stage == 'choosing_theme':
                 
                 # Limpa a lousa para o novo poema
                 st.session_state.poem_text = ""
+                st.session_state.pop("poem_editor", None)
                 st.session_state.spell_errors = []
                 st.session_state.rhymes = None
                 st.session_state.rhyme_word = ""
-                st.session_state.pdf_data = None
+                st.session_state.poem_rhymes = None
+                st.session_state.pdf_handle = None
+                st.session_state.theme_suggestions = []
 
-                with st.spinner("Preparando sua oficina de escrita..."):
-                    st.session_state.theme_suggestions = generate_progression_ideas(theme)
+                # Ideias, design do PDF e rimas do tema começam em paralelo; cada etapa só espera o que usar
+                cancel_prefetch(st.session_state.prefetch)
+                st.session_state.prefetch = start_theme_prefetch(theme)
+                save_draft()
                 st.session_state.app_stage = 'writing_poem'
                 st.rerun()
 
@@ -113,50 +303,26 @@ elif st.session_state.app_stage == 'writing_poem':
     col_editor, col_sidebar = st.columns([2, 1])
 
     with col_editor:
-        with st.container(border=True):
-            st.subheader("Escreva seu poema aqui")
-            st.session_state.poem_text = st.text_area("Seu Poema", value=st.session_state.poem_text, height=450, key="poem_editor", label_visibility="collapsed")
+        poem_workspace()
     
     # BARRA LATERAL (Ferramentas de Criação)
     with col_sidebar:
-        with st.container(border=True):
-            st.subheader("🔎 Caça-Rimas")
-            rhyme_word_input = st.text_input("Digite uma palavra para rimar:", key="rhyme_input")
-            if st.button("Buscar Rimas"):
-                if rhyme_word_input:
-                    with st.spinner(f"Buscando rimas para '{rhyme_word_input}'..."):
-                        st.session_state.rhymes = get_ai_rhymes(rhyme_word_input, st.session_state.chosen_theme)
-                        st.session_state.rhyme_word = rhyme_word_input
-                else:
-                    st.toast("Digite uma palavra!", icon="❗️")
-            
-            if st.session_state.rhymes:
-                st.markdown(f"**Rimas para '{st.session_state.rhyme_word}':**")
-                if "Erro" in st.session_state.rhymes[0]['palavra']:
-                    st.warning(st.session_state.rhymes[0]['definicao'])
-                else:
-                    rhyme_html = "<div class='rhyme-list'>"
-                    for rhyme in st.session_state.rhymes:
-                        rhyme_html += f"<div><b>{rhyme['palavra']}:</b> <i>{rhyme['definicao']}</i></div>"
-                    rhyme_html += "</div>"
-                    st.markdown(rhyme_html, unsafe_allow_html=True)
+        rhyme_finder()
 
         with st.container(border=True):
             st.subheader("💡 Inspiração Criativa")
             st.caption("Uma lista de ideias para te ajudar a guiar seu poema.")
+            if not st.session_state.theme_suggestions:
+                with st.spinner("Preparando sua oficina de escrita..."):
+                    st.session_state.theme_suggestions = await_task(
+                        st.session_state.prefetch, "ideas", lambda: generate_progression_ideas(st.session_state.chosen_theme)
+                    )
             if st.session_state.theme_suggestions:
                 if "Erro:" in st.session_state.theme_suggestions[0]:
                     st.warning(st.session_state.theme_suggestions[0])
                 else:
                     for i, idea in enumerate(st.session_state.theme_suggestions):
                         st.markdown(f"**{i+1}.** {idea}")
-        
-        with st.container(border=True):
-            st.subheader("📊 Estatísticas do Poema")
-            verses, stanzas = get_poem_stats(st.session_state.poem_text)
-            c1, c2 = st.columns(2)
-            c1.metric("Versos", verses)
-            c2.metric("Estrofes", stanzas)
 
     st.markdown("---")
     if st.button("Concluir e Ir para Revisão 🏁", type="primary", use_container_width=True):
@@ -174,39 +340,7 @@ elif st.session_state.app_stage == 'spell_check_screen':
     st.title("🕵️‍♀️ Oficina de Revisão")
     st.info("Aqui estão algumas sugestões do Assistente. Você pode clicar nos botões para corrigir ou editar seu texto manualmente.")
 
-    col_editor, col_corrections = st.columns(2)
-
-    with col_editor:
-        st.subheader("Seu Poema (Editável)")
-        st.session_state.poem_text = st.text_area("Seu Poema", value=st.session_state.poem_text, height=450, key="poem_editor", label_visibility="collapsed")
-
-    with col_corrections:
-        st.subheader("Dicas do Assistente")
-        if not st.session_state.spell_errors:
-            st.success("Nenhum problema encontrado! Seu poema está ótimo. 🎉")
-        else:
-            errors_by_verse = defaultdict(list)
-            for error in st.session_state.spell_errors:
-                errors_by_verse[error['verse_number']].append(error)
-
-            st.markdown("<div class='correction-list'>", unsafe_allow_html=True)
-            for verse_num, errors in sorted(errors_by_verse.items()):
-                st.markdown(f"<div class='correction-verse'>", unsafe_allow_html=True)
-                st.markdown(f"**No Verso {verse_num}:**")
-                for error in errors:
-                    st.write(f"Problema: **`{error['original']}`**")
-                    
-                    cols = st.columns(len(error['suggestions']))
-                    for i, suggestion in enumerate(error['suggestions']):
-                        cols[i].button(
-                            suggestion, 
-                            key=f"corr_{verse_num}_{error['original']}_{suggestion}",
-                            on_click=apply_correction,
-                            args=(error['original'], suggestion)
-                        )
-                    st.caption(f"Motivo: {error['reason']}")
-                st.markdown(f"</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+    review_workspace()
 
     st.markdown("---")
     col_nav1, col_nav2 = st.columns(2)
@@ -217,12 +351,13 @@ elif st.session_state.app_stage == 'spell_check_screen':
     with col_nav2:
         if st.button("Finalizar e Gerar PDF 🏁", type="primary", use_container_width=True):
             st.session_state.app_stage = 'finalizing_poem'
-            st.session_state.pdf_data = None # Limpa PDF antigo
+            st.session_state.pdf_handle = None # Limpa PDF antigo
             st.rerun()
 
 
 # ETAPA 5: Finalização e Geração de PDF
 elif st.session_state.app_stage == 'finalizing_poem':
+    from pdf_generator import create_poem_pdf, local_pdf_style  # fpdf só carrega nesta etapa
     st.title("Quase lá! Vamos dar um Título ao seu Poema 🏆")
     
     with st.form("pdf_form"):
@@ -235,24 +370,31 @@ elif st.session_state.app_stage == 'finalizing_poem':
                 st.error("Por favor, preencha o título e o seu nome!")
             else:
                 with st.spinner("O Assistente está criando um design mágico para o seu poema..."):
-                    style = generate_pdf_style(st.session_state.chosen_theme, st.session_state.poem_text)
+                    # O estilo da IA só entra se já ficou pronto em segundo plano; senão o local sai na hora
+                    style = ready_result(st.session_state.prefetch, "style") or local_pdf_style(
+                        st.session_state.chosen_theme, st.session_state.poem_text
+                    )
                     if style:
-                        st.session_state.pdf_data = create_poem_pdf(poem_title, author_name, st.session_state.poem_text, style)
+                        st.session_state.pdf_handle = blob_store.put(create_poem_pdf(poem_title, author_name, st.session_state.poem_text, style))
                         st.session_state.pdf_filename = f"{re.sub('[^A-Za-z0-9]+', '_', poem_title)}.pdf"
                         st.balloons()
                         st.success("Seu poema está pronto! O botão de download apareceu abaixo.")
                     else:
                         st.error("O Assistente não conseguiu criar o design. Tente novamente.")
 
-    if st.session_state.pdf_data:
+    pdf_data = blob_store.get(st.session_state.pdf_handle) if st.session_state.pdf_handle else None
+    if pdf_data:
         st.download_button(
             label="Baixar meu Poema em PDF 📄",
-            data=st.session_state.pdf_data,
+            data=pdf_data,
             file_name=st.session_state.pdf_filename,
             mime="application/pdf"
         )
+    elif st.session_state.pdf_handle:
+        st.session_state.pdf_handle = None
+        st.info("Seu PDF ficou muito tempo sem ser baixado e foi apagado. É só gerar de novo!")
 
     if st.button("Voltar para a Revisão 🕵️‍♀️"):
         st.session_state.app_stage = 'spell_check_screen'
-        st.session_state.pdf_data = None
+        st.session_state.pdf_handle = None
         st.rerun()
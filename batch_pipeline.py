@@ -0,0 +1,263 @@
+# Arquivo: batch_pipeline.py
+#
+# Revisão e PDFs de uma turma inteira sem passar pelas telas do app.
+# Lê um JSONL de poemas ({"text"} e, opcionalmente, "theme", "title", "author" e "id"), e para cada um:
+# find_errors -> (opcional) aplica a primeira sugestão de cada erro -> generate_pdf_style -> create_poem_pdf.
+# Os PDFs e uma linha de resultado por poema são gravados assim que ficam prontos; o arquivo de
+# resultados é também o ponto de retomada: rodar de novo pula o que já terminou. Uma linha inválida
+# (JSON quebrado, sem texto) vira um resultado de erro e o lote segue.
+# A chave da IA vem do .streamlit/secrets.toml, como no app; sem ela, a revisão e o estilo ficam só locais
+# e --apply-suggestions só aplica o que não depende da IA (as suspeitas do dicionário ficam para o professor).
+# Uso: python batch_pipeline.py turma.jsonl --out saida/ [--apply-suggestions] [--workers 8] \
+#          [--render-workers 2] [--style ia|local] [--json relatorio.json]
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ai_core import has_api_key
+from spell_checker import find_errors, apply_suggestion
+from pdf_generator import create_poem_pdf, generate_pdf_style, local_pdf_style
+
+BATCH_API_WORKERS = 8       # poemas na etapa da IA (revisão e estilo) ao mesmo tempo
+BATCH_RENDER_WORKERS = 1    # processos renderizando PDFs; com 1, o PDF sai nas mesmas threads da IA
+RESULTS_FILENAME = "resultados.jsonl"
+STAGES = ["review", "fix", "style", "pdf"]
+DEFAULT_TITLE = "Poema sem título"
+
+
+class StageClock:
+    """Tempo gasto e itens concluídos por etapa, somados de várias threads."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.items = defaultdict(int)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.items[stage] += 1
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            return {
+                stage: {
+                    "items": self.items[stage],
+                    "mean_ms": self.seconds[stage] / self.items[stage] * 1000 if self.items[stage] else 0.0,
+                    "throughput_per_s": self.items[stage] / wall if wall else 0.0,
+                }
+                for stage in STAGES
+            }
+
+
+def poem_key(poem, line_number):
+    """Identifica o poema no arquivo de resultados; mudar o texto faz o poema ser processado de novo."""
+    digest = hashlib.sha1(json.dumps(poem, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+    return f"{poem.get('id', line_number)}:{digest}"
+
+
+def read_poems(path):
+    """(número da linha, chave, poema, problema) de cada linha do JSONL, lidos sob demanda.
+
+    A chave sai da linha como está no arquivo; o poema já vem com os campos opcionais preenchidos.
+    problema é None, ou o motivo de a linha não poder ser processada.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                poem = json.loads(line)
+            except ValueError as e:
+                yield line_number, poem_key({"raw": line.strip()}, line_number), None, f"JSON inválido: {e}"
+                continue
+            if not isinstance(poem, dict):
+                yield line_number, poem_key({"raw": poem}, line_number), None, "a linha não é um objeto JSON"
+                continue
+            yield (line_number, poem_key(poem, line_number), *normalize_poem(poem))
+
+
+def normalize_poem(poem):
+    """(poema com os padrões, problema): só "text" é obrigatório; os outros campos precisam ser texto."""
+    if not isinstance(poem.get("text"), str) or not poem["text"].strip():
+        return poem, "poema sem o campo \"text\""
+    for field in ("title", "author", "theme"):
+        if not isinstance(poem.get(field, ""), str):
+            return poem, f"o campo \"{field}\" precisa ser texto"
+    return dict(poem, title=poem.get("title") or DEFAULT_TITLE, author=poem.get("author", ""),
+                theme=poem.get("theme", "")), None
+
+
+def completed_keys(results_path):
+    """Chaves dos poemas que já terminaram numa execução anterior (uma última linha cortada é ignorada)."""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("status") == "ok":
+                done.add(result["key"])
+    return done
+
+
+def pdf_filename(line_number, title):
+    return f"{line_number:04d}_{re.sub('[^A-Za-z0-9]+', '_', title).strip('_') or 'poema'}.pdf"
+
+
+def prepare_poem(poem, apply_suggestions, style_source, clock):
+    """Etapas que esperam a IA (revisão e estilo): rodam nas threads."""
+    text = poem["text"]
+    t = time.perf_counter()
+    errors = find_errors(text)
+    clock.add("review", time.perf_counter() - t)
+
+    applied = 0
+    if apply_suggestions:
+        t = time.perf_counter()
+        # Percorre uma cópia: apply_suggestion devolve a lista sem o erro corrigido. Palpites do
+        # dicionário que a IA não confirmou ficam no relatório, sem mexer no texto.
+        for error in list(errors):
+            if error['suggestions'] and error.get('confirmed', True):
+                text, errors = apply_suggestion(text, errors, error, error['suggestions'][0])
+                applied += 1
+        clock.add("fix", time.perf_counter() - t)
+
+    t = time.perf_counter()
+    theme = poem.get("theme", "")
+    style = generate_pdf_style(theme, text) if style_source == "ia" else local_pdf_style(theme, text)
+    clock.add("style", time.perf_counter() - t)
+    return text, errors, applied, style
+
+
+def _render(title, author, text, style):
+    start = time.perf_counter()
+    return create_poem_pdf(title, author, text, style, use_cache=False), time.perf_counter() - start
+
+
+def run_pipeline(input_path, out_dir, apply_suggestions=False, style_source="ia",
+                 workers=BATCH_API_WORKERS, render_workers=BATCH_RENDER_WORKERS, log=print):
+    """Processa o JSONL inteiro e devolve o relatório por etapa; pode ser interrompido e retomado."""
+    os.makedirs(out_dir, exist_ok=True)
+    warnings = []
+    if not has_api_key():
+        warnings.append("Sem a chave da IA (GOOGLE_API_KEY no .streamlit/secrets.toml): revisão só com o "
+                        "dicionário, estilo local e nenhuma sugestão não confirmada é aplicada.")
+        log(warnings[-1])
+        style_source = "local"
+    results_path = os.path.join(out_dir, RESULTS_FILENAME)
+    done = completed_keys(results_path)
+    clock = StageClock()
+    counts = defaultdict(int)
+    counts["skipped"] = 0
+
+    renderer = ProcessPoolExecutor(max_workers=render_workers) if render_workers > 1 else None
+    api = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oficina-lote")
+    pending = {}  # future -> (etapa, número da linha, poema, chave, dados da etapa anterior)
+
+    with open(results_path, "a", encoding="utf-8") as results:
+        def record(result):
+            results.write(json.dumps(result, ensure_ascii=False) + "\n")
+            results.flush()  # cada poema concluído já vale como ponto de retomada
+            counts[result["status"]] += 1
+            log(f"[{result['status']}] {result['line']}: {result.get('pdf') or result.get('error')}")
+
+        def finish(future):
+            stage, line_number, poem, key, prepared = pending.pop(future)
+            try:
+                value = future.result()
+            except Exception as e:
+                record({"key": key, "line": line_number, "status": "erro", "stage": stage, "error": str(e)})
+                return
+            if stage == "prepare":
+                text = value[0]
+                if renderer is not None:
+                    submitted = renderer.submit(_render, poem["title"], poem["author"], text, value[3])
+                else:
+                    submitted = api.submit(_render, poem["title"], poem["author"], text, value[3])
+                pending[submitted] = ("pdf", line_number, poem, key, value)
+                return
+            pdf_bytes, seconds = value
+            clock.add("pdf", seconds)
+            filename = pdf_filename(line_number, poem["title"])
+            try:
+                with open(os.path.join(out_dir, filename), "wb") as f:
+                    f.write(pdf_bytes)
+            except OSError as e:
+                record({"key": key, "line": line_number, "status": "erro", "stage": "pdf", "error": str(e)})
+                return
+            text, errors, applied, style = prepared
+            record({"key": key, "line": line_number, "status": "ok", "pdf": filename, "errors": errors,
+                    "applied": applied, "text": text, "style": style})
+
+        try:
+            for line_number, key, poem, problem in read_poems(input_path):
+                if key in done:
+                    counts["skipped"] += 1
+                    continue
+                if problem:
+                    record({"key": key, "line": line_number, "status": "erro", "stage": "entrada", "error": problem})
+                    continue
+                # No máximo 2 × workers poemas em andamento: o arquivo de entrada é lido aos poucos
+                while len(pending) >= 2 * workers:
+                    for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                        finish(future)
+                future = api.submit(prepare_poem, poem, apply_suggestions, style_source, clock)
+                pending[future] = ("prepare", line_number, poem, key, None)
+            while pending:
+                for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                    finish(future)
+        finally:
+            api.shutdown(wait=False, cancel_futures=True)
+            if renderer is not None:
+                renderer.shutdown(wait=False, cancel_futures=True)
+
+    return {"stages": clock.report(), "counts": dict(counts), "wall_seconds": time.perf_counter() - clock.started,
+            "warnings": warnings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Revisão e PDFs de um arquivo JSONL de poemas.")
+    parser.add_argument("input", help="JSONL com text (e, opcionalmente, theme, title e author) em cada linha")
+    parser.add_argument("--out", required=True, help="pasta dos PDFs e do arquivo de resultados (retomada)")
+    parser.add_argument("--apply-suggestions", action="store_true", help="aplica a primeira sugestão de cada erro")
+    parser.add_argument("--style", choices=["ia", "local"], default="ia", help="estilo do PDF pela IA ou só local")
+    parser.add_argument("--workers", type=int, default=BATCH_API_WORKERS)
+    parser.add_argument("--render-workers", type=int, default=BATCH_RENDER_WORKERS)
+    parser.add_argument("--quiet", action="store_true", help="não mostra uma linha por poema")
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    report = run_pipeline(args.input, args.out, args.apply_suggestions, args.style, args.workers,
+                          args.render_workers, log=(lambda message: None) if args.quiet else print)
+
+    print(f"{'etapa':<10}{'itens':>8}{'média ms':>12}{'por s':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<10}{stats['items']:>8}{stats['mean_ms']:>12.1f}{stats['throughput_per_s']:>10.2f}")
+    for warning in report["warnings"]:
+        print(warning, file=sys.stderr)
+    counts = report["counts"]
+    print(f"ok: {counts.get('ok', 0)}  erros: {counts.get('erro', 0)}  já feitos: {counts['skipped']}  "
+          f"tempo total: {report['wall_seconds']:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if counts.get("erro"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
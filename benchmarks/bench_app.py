@@ -0,0 +1,237 @@
+# Arquivo: benchmarks/bench_app.py
+#
+# Mede a latência (p50/p95/p99) e a vazão de cada etapa do app com um modelo falso local
+# (benchmarks/fake_gemini.py), sem chave de API. Também roda sessões completas pelas cinco
+# etapas do app, em paralelo, como uma turma usando ao mesmo tempo. Sem --warm, os caches são
+# esvaziados antes de cada chamada isolada e uma vez antes das sessões, que dividem o cache entre si.
+# Uso: python benchmarks/bench_app.py --iterations 20 --sessions 30 --concurrency 10 \
+#          [--latency 0.8 --jitter 0.2 --error-rate 0.05] [--warm] [--json atual.json] [--baseline anterior.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# O cache de respostas do benchmark não se mistura com o do app
+os.environ.setdefault("OFICINA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "oficina_bench", "respostas_ia.sqlite3"))
+os.environ.setdefault("OFICINA_BANK_PATH", os.path.join(tempfile.gettempdir(), "oficina_bench", "banco_aprendido.sqlite3"))
+
+import ai_core  # noqa: E402
+import pdf_generator  # noqa: E402
+import spell_checker  # noqa: E402
+import theme_bank  # noqa: E402
+from fake_gemini import FakeGenerativeModel, install  # noqa: E402
+from theme_generator import generate_themes, stream_themes, generate_progression_ideas  # noqa: E402
+from rhyme_engine import get_ai_rhymes, find_local_rhymes  # noqa: E402
+from spell_checker import find_errors, apply_suggestion  # noqa: E402
+from pdf_generator import create_poem_pdf, generate_pdf_style, local_pdf_style  # noqa: E402
+from prefetch import start_theme_prefetch, cancel_prefetch, await_task, ready_result, await_rhymes  # noqa: E402
+from meter import analyze_poem  # noqa: E402
+
+INTEREST = "futebol, meu cachorro e bolo de chocolate"
+# Fora do banco local de temas: sempre chega ao modelo (a não ser que já tenha sido aprendido)
+LONG_TAIL_INTEREST = "origami, xadrez e mitologia grega"
+LONG_TAIL_THEME = "O tabuleiro de xadrez do meu avô"
+THEME = "Meu cachorro e a chuva"
+RHYME_WORD = "chuva"
+POEM = """meu cachorro olha a chuva
+com o focinho na janela
+a agua cai na rua toda
+e ele late para ela
+
+quando o ceu fica cinzento
+ele corre pra caza
+e eu fico aqui dentro
+esperando o sol que atraza"""
+
+
+def percentile(sorted_values, p):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples, errors, wall_seconds):
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        "throughput_per_s": len(values) / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def reset_caches():
+    """Esvazia os caches do app para medir o caminho frio (cada chamada chega ao modelo)."""
+    ai_core.response_cache.clear()
+    with spell_checker._verse_cache_lock:
+        spell_checker._verse_cache.clear()
+    pdf_generator._render_poem_pdf.cache_clear()
+    theme_bank.theme_bank.clear_learned()
+
+
+def measure(fn, iterations, warm):
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not warm:
+            reset_caches()
+        t = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+            continue
+        samples.append(time.perf_counter() - t)
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+def first_item(generator):
+    for item in generator:
+        return item
+
+
+def function_benchmarks():
+    return {
+        "generate_themes": lambda: generate_themes(INTEREST),
+        "stream_themes_first_item": lambda: first_item(stream_themes(INTEREST)),
+        "stream_themes": lambda: list(stream_themes(INTEREST)),
+        "generate_themes_long_tail": lambda: generate_themes(LONG_TAIL_INTEREST),
+        "generate_progression_ideas": lambda: generate_progression_ideas(THEME),
+        "generate_progression_ideas_long_tail": lambda: generate_progression_ideas(LONG_TAIL_THEME),
+        "get_ai_rhymes": lambda: get_ai_rhymes(RHYME_WORD, THEME, find_local_rhymes(RHYME_WORD)),
+        "find_errors": lambda: find_errors(POEM),
+        "generate_pdf_style": lambda: generate_pdf_style(THEME, POEM),
+        "local_pdf_style": lambda: local_pdf_style(THEME, POEM),
+        "analyze_poem": lambda: analyze_poem(POEM),
+        "create_poem_pdf": lambda: create_poem_pdf("A Chuva", "Aluno", POEM, pdf_generator.DEFAULT_STYLE),
+    }
+
+
+SESSION_STAGES = ["getting_interest", "choosing_theme", "writing_poem", "spell_check_screen", "finalizing_poem"]
+
+
+def run_session():
+    """Um aluno passando pelas cinco etapas do app, chamando o que cada tela chama."""
+    timings = {}
+
+    t = time.perf_counter()
+    themes = list(stream_themes(INTEREST))
+    timings["getting_interest"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    theme = themes[1] if len(themes) > 1 else THEME
+    tasks = start_theme_prefetch(theme)
+    timings["choosing_theme"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    await_task(tasks, "ideas", lambda: generate_progression_ideas(theme))
+    local = find_local_rhymes(RHYME_WORD)
+    await_rhymes(tasks, RHYME_WORD, theme, local)
+    analyze_poem(POEM)  # painel de estatísticas (app.get_poem_stats)
+    timings["writing_poem"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    poem = POEM
+    errors = find_errors(poem)
+    while errors and errors[0]['suggestions']:
+        poem, errors = apply_suggestion(poem, errors, errors[0], errors[0]['suggestions'][0])
+    timings["spell_check_screen"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    style = ready_result(tasks, "style") or local_pdf_style(theme, poem)
+    create_poem_pdf(theme, "Aluno", poem, style)
+    timings["finalizing_poem"] = time.perf_counter() - t
+
+    cancel_prefetch(tasks)
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def session_benchmarks(sessions, concurrency, warm):
+    if not warm:
+        reset_caches()
+    samples = {name: [] for name in SESSION_STAGES + ["total"]}
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(run_session) for _ in range(sessions)]:
+            try:
+                timings = future.result()
+            except Exception:
+                errors += 1
+                continue
+            for name, value in timings.items():
+                samples[name].append(value)
+    wall = time.perf_counter() - start
+    return {f"session.{name}": summarize(values, errors, wall) for name, values in samples.items()}
+
+
+def compare(results, baseline, tolerance):
+    """Etapas cujo p95 piorou mais que a tolerância em relação ao arquivo de referência."""
+    regressions = []
+    for name, stats in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before and before["p95_ms"] > 0 and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append((name, before["p95_ms"], stats["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do app com um Gemini falso local.")
+    parser.add_argument("--iterations", type=int, default=20, help="chamadas por função")
+    parser.add_argument("--sessions", type=int, default=30, help="sessões completas simuladas")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessões ao mesmo tempo")
+    parser.add_argument("--latency", type=float, default=0.8, help="segundos até a resposta do modelo")
+    parser.add_argument("--jitter", type=float, default=0.2, help="desvio padrão da latência")
+    parser.add_argument("--chunk-size", type=int, default=40, help="caracteres por pedaço no streaming")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="segundos entre pedaços")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de chamadas com erro 429/503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fração de respostas cortadas")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="mantém os caches entre as chamadas")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--baseline", help="resultado anterior para comparar o p95")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora aceitável do p95 (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    model = install(FakeGenerativeModel(latency=args.latency, jitter=args.jitter, chunk_size=args.chunk_size,
+                                        chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                                        malformed_rate=args.malformed_rate, seed=args.seed))
+    results = {"config": vars(args), "stages": {}}
+    for name, fn in function_benchmarks().items():
+        results["stages"][name] = measure(fn, args.iterations, args.warm)
+    results["stages"].update(session_benchmarks(args.sessions, args.concurrency, args.warm))
+    results["model_calls"] = model.calls
+
+    print(f"{'etapa':<38}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'por s':>10}{'erros':>7}")
+    for name, stats in results["stages"].items():
+        print(f"{name:<38}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{stats['throughput_per_s']:>10.2f}{stats['errors']:>7}")
+    print(f"chamadas ao modelo: {model.calls}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSÃO {name}: p95 {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Arquivo: benchmarks/bench_cold_start.py
+#
+# Mede a partida a frio do app, cada rodada num interpretador novo (como um contêiner que acabou de subir):
+# tempo de importar o streamlit, tempo de importar os módulos do app e tempo até a primeira tela
+# (getting_interest) ficar pronta. Falha se a mediana passar do orçamento ou se a primeira tela
+# carregar dependências pesadas (SDK da IA, fpdf) que só as etapas seguintes usam.
+# Uso: python benchmarks/bench_cold_start.py --runs 5 --budget 1.0 [--json partida.json]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["google.generativeai", "fpdf"]
+APP_MODULES = ["ai_core", "theme_generator", "rhyme_engine", "spell_checker", "meter", "prefetch", "admin_panel", "session_store"]
+
+# Roda dentro do interpretador novo e imprime uma linha de JSON.
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+for name in {app_modules!r}:
+    __import__(name)
+modules_seconds = time.perf_counter() - start
+
+import ai_core
+ai_core.warm_up = lambda: None  # o aquecimento em segundo plano não entra na conta da primeira tela
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app_path!r}, default_timeout=60)
+start = time.perf_counter()
+app.run()
+first_paint_seconds = time.perf_counter() - start
+print(json.dumps({{
+    "streamlit_import_seconds": streamlit_seconds,
+    "app_modules_import_seconds": modules_seconds,
+    "first_paint_seconds": first_paint_seconds,
+    "exception": [str(e.value) for e in app.exception],
+    "heavy_modules_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe():
+    code = _PROBE.format(app_modules=APP_MODULES, app_path=os.path.join(ROOT, "app.py"), heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partida a frio do app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="segundos para importar os módulos do app e desenhar a primeira tela")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    results = {"runs": runs, "budget_seconds": args.budget}
+    for key in ("streamlit_import_seconds", "app_modules_import_seconds", "first_paint_seconds"):
+        results[key] = statistics.median(run[key] for run in runs)
+        print(f"{key:<30} mediana {results[key] * 1000:8.1f} ms")
+    results["cold_start_seconds"] = results["app_modules_import_seconds"] + results["first_paint_seconds"]
+    print(f"{'cold_start_seconds':<30} mediana {results['cold_start_seconds'] * 1000:8.1f} ms  (orçamento {args.budget * 1000:.0f} ms)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    problems = []
+    if results["cold_start_seconds"] > args.budget:
+        problems.append(f"partida a frio acima do orçamento ({results['cold_start_seconds']:.2f}s > {args.budget:.2f}s)")
+    heavy = sorted({m for run in runs for m in run["heavy_modules_loaded"]})
+    if heavy:
+        problems.append(f"a primeira tela carregou {', '.join(heavy)}")
+    errors = sorted({e for run in runs for e in run["exception"]})
+    if errors:
+        problems.append(f"a primeira tela deu erro: {errors[0]}")
+    for problem in problems:
+        print(f"FALHOU: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Arquivo: benchmarks/bench_pdf_batch.py
+#
+# Mede a vazão do gerador de PDFs em lote (poemas/segundo) para vários números de processos.
+# Os lotes não usam o cache de PDFs do processo: cada rodada renderiza todos os poemas de verdade
+# (o benchmark confere que o cache continua vazio, então nenhum processo filho herda PDFs prontos).
+# Uso: python benchmarks/bench_pdf_batch.py --poems 200 --workers 1 2 4 8 [--json resultado.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_batch import write_poems_zip, write_anthology  # noqa: E402
+from pdf_generator import _render_poem_pdf  # noqa: E402
+
+STYLES = [
+    {"font": "Helvetica", "bg_color_hex": "#F0F8FF", "text_color_hex": "#2F4F4F", "title_color_hex": "#FF6347",
+     "border_style": "simples", "border_color_hex": "#4682B4"},
+    {"font": "Times", "bg_color_hex": "#FFF8E7", "text_color_hex": "#3B2F2F", "title_color_hex": "#8B4513",
+     "border_style": "dupla", "border_color_hex": "#A0522D"},
+    {"font": "Courier", "bg_color_hex": "#0B1D3A", "text_color_hex": "#F5F5F5", "title_color_hex": "#FFD700",
+     "border_style": "estrelas", "border_color_hex": "#FFD700"},
+]
+
+VERSES = [
+    "O sol nasceu lá no quintal", "e o vento cantou pra mim", "a bola rolou no chão",
+    "meu coração bateu assim", "a lua espiou da janela", "e a noite ficou mais bela",
+]
+
+
+def sample_poems(count, verses_per_poem=24):
+    poems = []
+    for i in range(count):
+        text = "\n".join(VERSES[(i + j) % len(VERSES)] + ("\n" if j % 4 == 3 else "") for j in range(verses_per_poem))
+        poems.append({"title": f"Poema {i + 1}", "author": f"Aluno {i % 30 + 1}", "text": text, "style": STYLES[i % len(STYLES)]})
+    return poems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--poems", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    poems = sample_poems(args.poems)
+    results = {"poems": args.poems, "cpu_count": os.cpu_count(), "zip": [], "anthology": None}
+    _render_poem_pdf.cache_clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            write_poems_zip(poems, os.path.join(tmp, f"turma_{workers}.zip"), workers=workers)
+            elapsed = time.perf_counter() - start
+            if _render_poem_pdf.cache_info().currsize:
+                sys.exit("o lote passou pelo cache de PDFs: a medida não seria de renderizações reais")
+            results["zip"].append({"workers": workers, "seconds": elapsed, "poems_per_second": args.poems / elapsed})
+            print(f"zip      workers={workers:<3} {args.poems / elapsed:8.1f} poemas/s  ({elapsed:.2f}s)")
+
+        start = time.perf_counter()
+        write_anthology(poems, os.path.join(tmp, "antologia.pdf"))
+        elapsed = time.perf_counter() - start
+        results["anthology"] = {"seconds": elapsed, "poems_per_second": args.poems / elapsed}
+        print(f"antologia            {args.poems / elapsed:8.1f} poemas/s  ({elapsed:.2f}s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Arquivo: benchmarks/bench_prompt_tokens.py
+#
+# Tokens enviados por chamada em cada função da IA, antes e depois de separar as instruções fixas
+# (ai_core.instruction_model). Antes, cada chamada levava instruções + pedido; agora leva só o pedido,
+# e as instruções vão uma vez por processo (cache de contexto ou system instruction). Com system
+# instruction a API ainda cobra as instruções em toda chamada: só o cache de contexto tira isso da conta,
+# e ele só vale para instruções a partir de ai_core.PROMPT_CACHE_MIN_TOKENS.
+# Usa o modelo falso (benchmarks/fake_gemini.py) e a mesma estimativa do agendador (4 caracteres por token).
+# Uso: python benchmarks/bench_prompt_tokens.py [--json tokens.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OFICINA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "oficina_bench", "respostas_ia.sqlite3"))
+os.environ.setdefault("OFICINA_BANK_PATH", os.path.join(tempfile.gettempdir(), "oficina_bench", "banco_aprendido.sqlite3"))
+
+import ai_core  # noqa: E402
+from bench_app import reset_caches, LONG_TAIL_INTEREST, LONG_TAIL_THEME, THEME, RHYME_WORD, POEM  # noqa: E402
+from fake_gemini import FakeGenerativeModel, install  # noqa: E402
+from theme_generator import generate_themes, generate_progression_ideas  # noqa: E402
+from rhyme_engine import get_ai_rhymes, get_poem_rhymes, find_local_rhymes  # noqa: E402
+from spell_checker import find_errors  # noqa: E402
+from pdf_generator import generate_pdf_style  # noqa: E402
+
+
+def cases():
+    return {
+        "themes (fora do banco)": lambda: generate_themes(LONG_TAIL_INTEREST),
+        "ideas (fora do banco)": lambda: generate_progression_ideas(LONG_TAIL_THEME),
+        "rhymes": lambda: get_ai_rhymes(RHYME_WORD, THEME, find_local_rhymes(RHYME_WORD, limit=15)),
+        "poem_rhymes": lambda: get_poem_rhymes(POEM, THEME),
+        "spell": lambda: find_errors(POEM),
+        "style": lambda: generate_pdf_style(THEME, POEM),
+    }
+
+
+def record_calls():
+    """Troca ai_core._call_model por uma versão que anota (instruções, pedido) de cada chamada."""
+    calls = []
+    original = ai_core._call_model
+
+    def recording(model, prompt, *args, **kwargs):
+        calls.append((getattr(model, "instruction", ""), prompt))
+        return original(model, prompt, *args, **kwargs)
+
+    ai_core._call_model = recording
+    return calls
+
+
+def tokens(text):
+    return len(text) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens por chamada, antes e depois das instruções fixas.")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    install(FakeGenerativeModel(latency=0.0, jitter=0.0))
+    calls = record_calls()
+    results = {}
+    for name, fn in cases().items():
+        reset_caches()
+        del calls[:]
+        fn()
+        totals = defaultdict(int)
+        for instruction, prompt in calls:
+            totals["instruction"] = max(totals["instruction"], tokens(instruction))
+            totals["before"] += tokens(instruction + prompt)
+            totals["after"] += tokens(prompt)
+        totals["calls"] = len(calls)
+        # Na API de verdade: cache de contexto só a partir do mínimo que ela aceita
+        totals["api_mode"] = "cache" if totals["instruction"] >= ai_core.PROMPT_CACHE_MIN_TOKENS else "system"
+        totals["billed"] = totals["after"] + (0 if totals["api_mode"] == "cache" else totals["instruction"] * len(calls))
+        results[name] = dict(totals)
+
+    print(f"{'função':<26}{'chamadas':>9}{'instruções':>12}{'antes':>8}{'depois':>8}{'economia':>10}{'cobrados':>10}  modo na API")
+    for name, r in results.items():
+        saved = 1 - r["after"] / r["before"] if r["before"] else 0.0
+        print(f"{name:<26}{r['calls']:>9}{r['instruction']:>12}{r['before']:>8}{r['after']:>8}{saved:>10.0%}"
+              f"{r['billed']:>10}  {r['api_mode']}")
+    print("Tokens estimados do prompt, somados por função. 'depois' é o texto montado a cada chamada;")
+    print("'cobrados' soma as instruções quando a API não pode guardá-las no cache de contexto.")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Arquivo: benchmarks/fake_gemini.py
+#
+# Substituto local de genai.GenerativeModel para medir o app sem chave de API.
+# Responde no formato que cada prompt pede (lista Python, lista JSON ou objeto JSON; só JSON
+# quando a chamada pede response_mime_type), com latência, variação, streaming em pedaços,
+# taxa de erros e taxa de respostas cortadas configuráveis.
+
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as api_exceptions
+
+THEMES = [
+    "O cheiro do bolo da vovó", "Meu cachorro e a chuva", "A bola que fugiu do quintal",
+    "O recreio mais barulhento", "Uma noite sem luz na rua", "O skate e o vento",
+    "A árvore que vi crescer", "O segredo da minha gaveta", "Férias na praia", "O jogo que virou no fim",
+]
+IDEAS = [
+    "Que cheiro você sente quando pensa nesse tema?", "Descreva um som que só existe nesse lugar.",
+    "Qual cor aparece primeiro na sua cabeça?", "Conte o que suas mãos sentem nesse momento.",
+    "Imagine que o tema fala com você: o que ele diria?", "Compare o tema com um bicho.",
+    "Escreva sobre o antes e o depois.", "Qual é o pior e o melhor detalhe?",
+    "Quem mais aparece nessa lembrança?", "Termine com uma pergunta para o leitor.",
+]
+EXTRA_RHYMES = ["coração", "canção", "verão", "mão", "chão", "pão", "leão", "balão", "feijão", "violão"]
+STYLE = {
+    "font": "Times", "bg_color_hex": "#FFF8E7", "text_color_hex": "#3B2F2F",
+    "title_color_hex": "#8B4513", "border_style": "estrelas", "border_color_hex": "#A0522D",
+}
+
+
+def _close_brackets(text):
+    """Fecha os colchetes e chaves que ficaram abertos (o "conserto" de uma resposta cortada)."""
+    stack, quote, escaped = [], None, False
+    for c in text:
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == quote:
+                quote = None
+        elif c == '"':
+            quote = c
+        elif c in "[{":
+            stack.append("]" if c == "[" else "}")
+        elif c in "]}" and stack:
+            stack.pop()
+    return text + "".join(reversed(stack))
+
+
+def canned_payload(prompt, json_only=False):
+    """Texto de resposta no formato que o prompt pede."""
+    repair = re.search(r"Resposta recebida:\n\s*---\n\s*(.*)\n\s*---", prompt, re.DOTALL)
+    if repair:
+        return _close_brackets(repair.group(1).strip())
+    if "diretor de arte" in prompt:
+        return json.dumps(STYLE) if json_only else "```json\n" + json.dumps(STYLE) + "\n```"
+    if "verse_number" in prompt:
+        suspects = re.findall(r"'([^']+)' \(verso (\d+)(?:, talvez: ([^)]*))?\)", prompt)
+        errors = [
+            {"original": word, "suggestions": [s.strip() for s in hints.split(",")] if hints else [word.lower()],
+             "reason": "Confira a grafia desta palavra.", "verse_number": int(verse)}
+            for word, verse, hints in suspects
+        ]
+        return json.dumps(errors, ensure_ascii=False)
+    if '"alvo"' in prompt:
+        targets = re.findall(r"^\s*- '([^']+)'(?: \(já temos: (.*)\))?$", prompt, re.MULTILINE)
+        return json.dumps([
+            {"alvo": word, "rimas": [{"palavra": w, "definicao": f"Definição simples de {w}."}
+                                     for w in [k.strip() for k in known.split(",") if k.strip()] + EXTRA_RHYMES[:4]]}
+            for word, known in targets
+        ], ensure_ascii=False)
+    if '"palavra"' in prompt:
+        known = re.search(r"Já encontramos estas rimas para '[^']*': (.*)\.\n", prompt)
+        words = [w.strip() for w in known.group(1).split(",")] if known else []
+        words += EXTRA_RHYMES[:6 if words else 10]
+        return json.dumps([{"palavra": w, "definicao": f"Definição simples de {w}."} for w in words], ensure_ascii=False)
+    if "10 temas" in prompt:
+        return json.dumps(THEMES, ensure_ascii=False) if json_only else "Aqui estão os temas:\n" + repr(THEMES)
+    if "10 ideias" in prompt:
+        return json.dumps(IDEAS, ensure_ascii=False) if json_only else repr(IDEAS)
+    return "[]"
+
+
+class FakeGenerativeModel:
+    """Imita a interface de genai.GenerativeModel usada pelo app (generate_content e model_name)."""
+
+    def __init__(self, model_name="gemini-2.5-flash", latency=0.8, jitter=0.2, chunk_size=40,
+                 chunk_delay=0.02, error_rate=0.0, malformed_rate=0.0, seed=None):
+        self.model_name = f"models/{model_name}"
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            failed = self._random.random() < self.error_rate
+            server_error = self._random.random() < 0.5
+            malformed = self._random.random() < self.malformed_rate
+        time.sleep(delay)
+        if failed:
+            if server_error:
+                raise api_exceptions.ServiceUnavailable("Fake: serviço indisponível")
+            raise api_exceptions.ResourceExhausted("Fake: cota excedida")
+        return malformed
+
+    @staticmethod
+    def _usage(prompt, text):
+        prompt_tokens, response_tokens = len(prompt) // 4, len(text) // 4
+        return SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens,
+                               total_token_count=prompt_tokens + response_tokens)
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        json_only = (generation_config or {}).get("response_mime_type") == "application/json"
+        text = canned_payload(prompt, json_only)
+        if self._delay():
+            text = text[:-1]  # resposta cortada: falta o último colchete
+        if not stream:
+            return SimpleNamespace(text=text, usage_metadata=self._usage(prompt, text))
+        return self._stream(prompt, text)
+
+    def _stream(self, prompt, text):
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            last = start + self.chunk_size >= len(text)
+            yield SimpleNamespace(text=text[start:start + self.chunk_size],
+                                  usage_metadata=self._usage(prompt, text) if last else None)
+
+
+def install(model):
+    """Troca o modelo base do ai_core pelo falso.
+
+    Os módulos do app pegam o modelo por ai_core.instruction_model(), que parte de
+    ai_core.configure_ai(): trocar este é o único ponto necessário. Os modelos com instruções
+    já criados são refeitos na próxima chamada, porque o modelo base mudou.
+    """
+    import ai_core
+
+    ai_core.configure_ai = lambda: model
+    return model
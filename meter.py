@@ -0,0 +1,87 @@
+# Arquivo: meter.py
+
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from rhyme_engine import word_stress, analyze_word, scheme_letters
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+_VOWEL_LETTERS = set("aeiouáéíóúâêôãõàü")
+
+METRE_NAMES = {
+    1: "monossílabo", 2: "dissílabo", 3: "trissílabo", 4: "tetrassílabo", 5: "redondilha menor",
+    6: "hexassílabo", 7: "redondilha maior", 8: "octossílabo", 9: "eneassílabo", 10: "decassílabo",
+    11: "hendecassílabo", 12: "alexandrino",
+}
+
+# syllables: sílabas poéticas (até a última tônica); stresses: posições das tônicas (1 = primeira)
+VerseMeter = namedtuple("VerseMeter", "syllables stresses end_word rhyme_key")
+PoemStats = namedtuple("PoemStats", "verses stanzas lines schemes metre")
+
+
+def _starts_with_vowel(word):
+    return word[0] in _VOWEL_LETTERS or (word[0] == "h" and word[1:2] in _VOWEL_LETTERS)
+
+
+@lru_cache(maxsize=4096)
+def analyze_verse(line):
+    """Escansão de um verso: junta as vogais entre palavras (elisão e sinalefa) e para na última tônica.
+
+    O resultado fica guardado pelo texto da linha: a cada rerun só os versos editados são recalculados.
+    """
+    total, stresses = 0, []
+    previous = None  # (terminou em vogal?, última sílaba era tônica?)
+    end_word = None
+    for word in _WORD_RE.findall(line.lower()):
+        stress = word_stress(word)
+        if stress is None:
+            continue
+        count, stressed = stress
+        # Sinalefa: vogal final de uma palavra + vogal inicial da próxima viram uma sílaba só,
+        # a não ser que as duas sílabas sejam tônicas ("café amargo" junta; "pá alta" não)
+        merge = (previous is not None and previous[0] and _starts_with_vowel(word)
+                 and not (previous[1] and stressed == 0))
+        base = total - 1 if merge else total
+        if stressed is not None:
+            stresses.append(base + stressed + 1)
+        total = base + count
+        previous = (word[-1] in _VOWEL_LETTERS, stressed is not None and stressed == count - 1)
+        end_word = word
+    if end_word is None:
+        return None
+    info = analyze_word(end_word)
+    return VerseMeter(stresses[-1] if stresses else total, tuple(stresses), end_word, info.key if info else None)
+
+
+def metre_name(syllables):
+    return METRE_NAMES.get(syllables, "verso bárbaro" if syllables > 12 else "")
+
+
+def analyze_poem(text):
+    """Versos, estrofes, escansão de cada verso, esquema de rimas por estrofe e a métrica mais comum.
+
+    lines é uma lista de (número do verso, VerseMeter); metre é None num poema sem versos.
+    """
+    lines, schemes, stanza_words = [], [], []
+    verses = stanzas = 0
+    in_stanza = False
+    for number, line in enumerate(text.split('\n'), start=1):
+        if not line.strip():
+            if stanza_words:
+                schemes.append(scheme_letters(stanza_words))
+                stanza_words = []
+            in_stanza = False
+            continue
+        verses += 1
+        if not in_stanza:
+            stanzas += 1
+            in_stanza = True
+        verse = analyze_verse(line.strip())
+        if verse is not None:
+            lines.append((number, verse))
+            stanza_words.append(verse.end_word)
+    if stanza_words:
+        schemes.append(scheme_letters(stanza_words))
+    counts = Counter(verse.syllables for _, verse in lines)
+    metre = counts.most_common(1)[0][0] if counts else None
+    return PoemStats(verses, stanzas, lines, schemes, metre)
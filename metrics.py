@@ -0,0 +1,176 @@
+# Arquivo: metrics.py
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+METRICS_WINDOW = 1000  # amostras recentes guardadas por série (histogramas "rolantes")
+METRICS_EXPORT_PATH = os.environ.get(
+    "OFICINA_METRICS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "metricas.prom"),
+)
+METRICS_EXPORT_INTERVAL = 15  # segundos entre gravações do arquivo no formato do Prometheus
+
+# Unidade e descrição de cada série observada (vai para o HELP da exportação).
+SERIES = {
+    "call_seconds": "Tempo de parede de cada chamada (inclui acertos de cache)",
+    "first_chunk_seconds": "Tempo até o primeiro pedaço de texto no streaming",
+    "queue_seconds": "Espera na fila do agendador antes de chamar a IA",
+    "prompt_chars": "Tamanho do prompt em caracteres",
+    "response_chars": "Tamanho da resposta em caracteres (ou bytes do PDF)",
+    "prompt_tokens": "Tokens do prompt informados pela API",
+    "response_tokens": "Tokens da resposta informados pela API",
+    "cached_tokens": "Tokens do prompt que vieram do cache de contexto da API (instruções fixas)",
+    "session_bytes": "Memória ocupada por uma sessão do app, em bytes (medida a cada rerun)",
+}
+COUNTERS = {
+    "calls": "Chamadas feitas",
+    "cache_hits": "Chamadas respondidas pelo cache",
+    "parse_failures": "Respostas que o parser recusou",
+    "repairs": "Respostas fora do esquema devolvidas à IA para conserto",
+    "errors": "Chamadas que falharam na API",
+    "retries": "Novas tentativas depois de uma falha",
+    "deduplicated": "Chamadas que esperaram uma chamada idêntica em andamento",
+    "bank_hits": "Temas e ideias respondidos pelo banco local, sem chamar a IA",
+    "session_trims": "Listas descartadas de sessões que passaram do limite de memória",
+}
+
+
+class Metrics:
+    """Contadores e amostras recentes por (série, função), seguros para várias threads."""
+
+    def __init__(self, window):
+        self.window = window
+        self.counters = defaultdict(float)
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.sums = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def increment(self, name, tag, amount=1):
+        with self._lock:
+            self.counters[(name, tag)] += amount
+
+    def observe(self, name, tag, value):
+        with self._lock:
+            self._observe(name, tag, value)
+
+    def _observe(self, name, tag, value):
+        self.samples[(name, tag)].append(value)
+        self.sums[(name, tag)] += value
+        self.counts[(name, tag)] += 1
+
+    def record_call(self, tag, seconds, cache_hit=False, prompt_chars=None, response_chars=None, usage=None):
+        """Registra uma chamada inteira de uma vez (um lock só no caminho quente)."""
+        with self._lock:
+            self.counters[("calls", tag)] += 1
+            if cache_hit:
+                self.counters[("cache_hits", tag)] += 1
+            self._observe("call_seconds", tag, seconds)
+            if prompt_chars is not None:
+                self._observe("prompt_chars", tag, prompt_chars)
+            if response_chars is not None:
+                self._observe("response_chars", tag, response_chars)
+            if usage is not None:
+                for name, attribute in (("prompt_tokens", "prompt_token_count"), ("response_tokens", "candidates_token_count"),
+                                        ("cached_tokens", "cached_content_token_count")):
+                    value = getattr(usage, attribute, None)
+                    if value is not None:
+                        self._observe(name, tag, value)
+
+    def tags(self):
+        with self._lock:
+            return sorted({tag for _, tag in list(self.counters) + list(self.samples)})
+
+    def quantiles(self, name, tag, points=(0.5, 0.95, 0.99)):
+        with self._lock:
+            values = sorted(self.samples.get((name, tag), ()))
+        if not values:
+            return {}
+        return {p: values[min(len(values) - 1, int(p * len(values)))] for p in points}
+
+    def histogram(self, name, tag, bounds):
+        """Contagem das amostras recentes em cada faixa (limite superior; a última é +Inf)."""
+        with self._lock:
+            values = list(self.samples.get((name, tag), ()))
+        counts = [0] * (len(bounds) + 1)
+        for value in values:
+            counts[next((i for i, bound in enumerate(bounds) if value <= bound), len(bounds))] += 1
+        return counts
+
+    def snapshot(self):
+        """Resumo por função: contadores, médias totais e quantis da janela recente."""
+        summary = {}
+        for tag in self.tags():
+            with self._lock:
+                entry = {name: self.counters.get((name, tag), 0) for name in COUNTERS}
+                means = {name: self.sums[(name, tag)] / self.counts[(name, tag)]
+                         for name in SERIES if self.counts.get((name, tag))}
+            entry["mean"] = means
+            entry["quantiles"] = {name: self.quantiles(name, tag) for name in SERIES if name in means}
+            summary[tag] = entry
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.samples.clear()
+            self.sums.clear()
+            self.counts.clear()
+            self.started = time.time()
+
+    def prometheus_text(self):
+        """Exportação no formato de texto do Prometheus: contadores e resumos (quantis da janela recente)."""
+        lines = []
+        tags = self.tags()
+        for name, help_text in COUNTERS.items():
+            lines += [f"# HELP oficina_{name}_total {help_text}", f"# TYPE oficina_{name}_total counter"]
+            with self._lock:
+                for tag in tags:
+                    lines.append(f'oficina_{name}_total{{function="{tag}"}} {self.counters.get((name, tag), 0):g}')
+        for name, help_text in SERIES.items():
+            lines += [f"# HELP oficina_{name} {help_text}", f"# TYPE oficina_{name} summary"]
+            for tag in tags:
+                if not self.counts.get((name, tag)):
+                    continue
+                for p, value in self.quantiles(name, tag).items():
+                    lines.append(f'oficina_{name}{{function="{tag}",quantile="{p}"}} {value:g}')
+                with self._lock:
+                    lines.append(f'oficina_{name}_sum{{function="{tag}"}} {self.sums[(name, tag)]:g}')
+                    lines.append(f'oficina_{name}_count{{function="{tag}"}} {self.counts[(name, tag)]}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(METRICS_WINDOW)
+_last_export = 0.0
+_export_lock = threading.Lock()
+
+
+def export_prometheus(path=METRICS_EXPORT_PATH):
+    """Grava as métricas num arquivo (troca atômica, para o coletor nunca ler pela metade)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(metrics.prometheus_text())
+    os.replace(temporary, path)
+
+
+def maybe_export():
+    """Exporta no máximo uma vez a cada METRICS_EXPORT_INTERVAL segundos.
+
+    Só o processo do app (app.py, a cada rerun) chama: os lotes, os benchmarks e os processos filhos
+    têm registros próprios e parciais, que não podem sobrescrever o arquivo do servidor.
+    """
+    global _last_export
+    now = time.time()
+    if now - _last_export < METRICS_EXPORT_INTERVAL or not _export_lock.acquire(blocking=False):
+        return
+    try:
+        _last_export = now
+        export_prometheus()
+    except OSError:
+        pass  # sem disco, as métricas continuam no painel
+    finally:
+        _export_lock.release()
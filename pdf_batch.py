@@ -0,0 +1,125 @@
+# Arquivo: pdf_batch.py
+
+import json
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pdf_generator import PoemPDF, DEFAULT_STYLE, create_poem_pdf, write_poem
+
+BATCH_WORKERS = os.cpu_count() or 1
+
+# Estilos recebidos pelo processo de trabalho no início; cada tarefa só manda o índice do estilo.
+_worker_styles = []
+
+
+def _init_worker(styles):
+    global _worker_styles
+    _worker_styles = styles
+
+
+def _render_task(task):
+    title, author, text, style_index = task
+    return create_poem_pdf(title, author, text, _worker_styles[style_index], use_cache=False)
+
+
+def _style_table(poems, default_style):
+    """Deduplica os estilos: poemas com o mesmo guia de estilo compartilham a mesma entrada."""
+    styles, index_by_key, tasks = [], {}, []
+    for poem in poems:
+        style = poem.get("style") or default_style
+        key = json.dumps(style, sort_keys=True)
+        if key not in index_by_key:
+            index_by_key[key] = len(styles)
+            styles.append(style)
+        tasks.append((poem["title"], poem["author"], poem["text"], index_by_key[key]))
+    return styles, tasks
+
+
+def pdf_filename(index, title):
+    return f"{index + 1:03d}_{re.sub('[^A-Za-z0-9]+', '_', title).strip('_') or 'poema'}.pdf"
+
+
+def iter_poem_pdfs(poems, default_style=None, workers=BATCH_WORKERS):
+    """Renderiza os poemas num pool de processos e devolve (índice, poema, bytes do PDF) em ordem.
+
+    Cada poema é um dicionário com "title", "author", "text" e, opcionalmente, "style".
+    No máximo 2 × workers PDFs ficam prontos na memória ao mesmo tempo.
+    """
+    poems = list(poems)
+    styles, tasks = _style_table(poems, default_style or DEFAULT_STYLE)
+    if workers <= 1:
+        _init_worker(styles)
+        for i, task in enumerate(tasks):
+            yield i, poems[i], _render_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(styles,)) as executor:
+        pending = deque()
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            while next_task < len(tasks) and len(pending) < 2 * workers:
+                pending.append((next_task, executor.submit(_render_task, tasks[next_task])))
+                next_task += 1
+            i, future = pending.popleft()
+            yield i, poems[i], future.result()
+
+
+def write_poems_zip(poems, zip_path, default_style=None, workers=BATCH_WORKERS):
+    """Gera um PDF por poema e grava direto num arquivo ZIP, sem guardar todos na memória."""
+    count = 0
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for i, poem, pdf_bytes in iter_poem_pdfs(poems, default_style, workers):
+            archive.writestr(pdf_filename(i, poem["title"]), pdf_bytes)
+            count += 1
+    return count
+
+
+def _render_toc(pdf, outline):
+    pdf.set_font(pdf.style['font'], 'B', 20)
+    pdf.set_text_color(pdf.title_r, pdf.title_g, pdf.title_b)
+    pdf.cell(0, 15, "Sumário", align='C', new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+    pdf.set_font(pdf.style['font'], '', 12)
+    pdf.set_text_color(pdf.text_r, pdf.text_g, pdf.text_b)
+    for section in outline:
+        pdf.cell(pdf.epw - 20, 9, section.name, new_x="RIGHT", new_y="TOP")
+        pdf.cell(20, 9, str(section.page_number), align='R', new_x="LMARGIN", new_y="NEXT")
+
+
+def write_anthology(poems, pdf_path, title="Antologia da Turma", default_style=None):
+    """Gera um único PDF com capa, sumário e uma seção por poema, cada um com o seu estilo.
+
+    Um documento só não pode ser montado em vários processos, então a antologia é
+    renderizada em sequência; os estilos repetidos são interpretados uma única vez.
+    """
+    poems = list(poems)
+    default_style = default_style or DEFAULT_STYLE
+    styles, tasks = _style_table(poems, default_style)
+
+    pdf = PoemPDF(default_style)
+    pdf.set_title(title)
+    pdf.add_page()
+    pdf.set_font(default_style['font'], 'B', 32)
+    pdf.set_text_color(pdf.title_r, pdf.title_g, pdf.title_b)
+    pdf.set_y(pdf.h / 3)
+    pdf.multi_cell(0, 18, title, align='C')
+    pdf.ln(5)
+    pdf.set_font(default_style['font'], '', 14)
+    pdf.set_text_color(pdf.text_r, pdf.text_g, pdf.text_b)
+    pdf.multi_cell(0, 10, f"{len(poems)} poemas - {datetime.now().strftime('%d/%m/%Y')}", align='C')
+
+    pdf.add_page()
+    pdf.insert_toc_placeholder(_render_toc, pages=1, allow_extra_pages=True)
+
+    for poem_title, author, text, style_index in tasks:
+        style = styles[style_index]
+        pdf.use_style(style)
+        pdf.add_page()
+        pdf.start_section(f"{poem_title} - {author}")
+        write_poem(pdf, poem_title, author, text, style)
+    pdf.use_style(default_style)
+    pdf.output(pdf_path)
+    return len(poems)
@@ -1,54 +1,231 @@
 # Arquivo: pdf_generator.py (VERSÃO FINAL - Com Decoração Desenhada)
 
 from fpdf import FPDF
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 import json
-from ai_core import configure_ai
+import os
+import re
+import time
+from ai_core import instruction_model, generate
+from metrics import metrics
+from theme_bank import tokenize
 from math import cos as _cos, sin as _sin
 
+_COLOR = {"type": "string", "description": "Cor em hexadecimal, ex.: #F0F8FF"}
+_STYLE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "font": {"type": "string", "enum": ["Courier", "Helvetica", "Times"]},
+        "bg_color_hex": _COLOR, "text_color_hex": _COLOR, "title_color_hex": _COLOR,
+        "border_style": {"type": "string", "enum": ["simples", "dupla", "estrelas"]},
+        "border_color_hex": _COLOR,
+    },
+    "required": ["font", "bg_color_hex", "text_color_hex", "title_color_hex", "border_style", "border_color_hex"],
+}
+
+DEFAULT_STYLE = {
+    "font": "Helvetica", "bg_color_hex": "#F0F8FF", 
+    "text_color_hex": "#2F4F4F", "title_color_hex": "#FF6347",
+    "border_style": "simples", "border_color_hex": "#4682B4"
+}
+
+# Com "0", o estilo é só o local; senão a IA refina o estilo em segundo plano enquanto o aluno escreve
+PDF_STYLE_AI = os.environ.get("OFICINA_PDF_STYLE_AI", "1") != "0"
+
+# Contraste mínimo com o fundo (WCAG 2.1, nível AA): texto normal; título (texto grande) e borda
+WCAG_TEXT_RATIO = 4.5
+WCAG_LARGE_RATIO = 3.0
+
+# Paletas curadas; local_pdf_style escolhe uma pelas palavras do tema
+PALETTES = {
+    "padrao": DEFAULT_STYLE,
+    "mar": {"font": "Helvetica", "bg_color_hex": "#EAF6FB", "text_color_hex": "#0B3C5D",
+            "title_color_hex": "#1D6FA3", "border_style": "dupla", "border_color_hex": "#3A8DBF"},
+    "natureza": {"font": "Times", "bg_color_hex": "#F1F8E9", "text_color_hex": "#2E4A1F",
+                 "title_color_hex": "#4E7D2B", "border_style": "simples", "border_color_hex": "#6B8E23"},
+    "noite": {"font": "Helvetica", "bg_color_hex": "#14213D", "text_color_hex": "#F5F3E7",
+              "title_color_hex": "#FCA311", "border_style": "estrelas", "border_color_hex": "#FCA311"},
+    "esporte": {"font": "Helvetica", "bg_color_hex": "#F4FBF4", "text_color_hex": "#1B3A1B",
+                "title_color_hex": "#C62828", "border_style": "dupla", "border_color_hex": "#2E7D32"},
+    "aconchego": {"font": "Times", "bg_color_hex": "#FFF8E7", "text_color_hex": "#3B2F2F",
+                  "title_color_hex": "#8B4513", "border_style": "simples", "border_color_hex": "#A0522D"},
+    "festa": {"font": "Helvetica", "bg_color_hex": "#FFF5FA", "text_color_hex": "#4A1942",
+              "title_color_hex": "#D81B60", "border_style": "estrelas", "border_color_hex": "#8E24AA"},
+    "bichos": {"font": "Times", "bg_color_hex": "#FDF6EC", "text_color_hex": "#4E342E",
+               "title_color_hex": "#E65100", "border_style": "dupla", "border_color_hex": "#8D6E63"},
+    "games": {"font": "Courier", "bg_color_hex": "#1E1E2E", "text_color_hex": "#E0F7FA",
+              "title_color_hex": "#00E676", "border_style": "dupla", "border_color_hex": "#7C4DFF"},
+    "chuva": {"font": "Times", "bg_color_hex": "#EEF1F5", "text_color_hex": "#263238",
+              "title_color_hex": "#455A64", "border_style": "simples", "border_color_hex": "#607D8B"},
+    "caderno": {"font": "Courier", "bg_color_hex": "#FFFDF5", "text_color_hex": "#1A237E",
+                "title_color_hex": "#C62828", "border_style": "simples", "border_color_hex": "#1A237E"},
+}
+_PALETTE_KEYWORDS = {
+    "mar": "praia mar onda areia férias verão peixe barco concha piscina viagem rio água mergulho",
+    "natureza": "natureza árvore floresta jardim flor planta primavera folha campo montanha semente",
+    "noite": "noite lua estrela espaço planeta marte foguete astronauta universo galáxia sonho escuro cometa",
+    "esporte": "futebol bola gol time jogo campeonato torcida skate bicicleta corrida vôlei basquete medalha treino",
+    "aconchego": "família mãe pai avó avô vovó vovô casa bolo cozinha almoço abraço quarto comida",
+    "festa": "festa aniversário presente balão natal carnaval música dança show canção vela",
+    "bichos": "cachorro gato bicho animal passarinho cavalo filhote coelho tartaruga leão borboleta",
+    "games": "videogame game pixel fase controle console minecraft personagem computador celular",
+    "chuva": "chuva tempestade trovão nuvem cinza saudade tristeza inverno outono vento frio",
+    "caderno": "escola aula professor caderno lápis livro história desenho prova recreio letra",
+}
+
+
+@lru_cache(maxsize=1)
+def _palette_index():
+    index = {}
+    for name, words in _PALETTE_KEYWORDS.items():
+        for token in tokenize(words):
+            index.setdefault(token, []).append(name)
+    return index
+
+
+@lru_cache(maxsize=1024)
+def classify_theme(text):
+    """Paleta cujas palavras-chave mais aparecem no texto; empate fica com a que vem antes. None se nenhuma."""
+    index = _palette_index()
+    votes = Counter(name for token in tokenize(text) for name in index.get(token, ()))
+    if not votes:
+        return None
+    order = list(_PALETTE_KEYWORDS)
+    return max(votes, key=lambda name: (votes[name], -order.index(name)))
+
+
+@lru_cache(maxsize=256)
+def relative_luminance(hex_color):
+    def channel(value):
+        value /= 255
+        return value / 12.92 if value <= 0.03928 else ((value + 0.055) / 1.055) ** 2.4
+    r, g, b = (channel(c) for c in hex_to_rgb(hex_color))
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(color, background):
+    lighter, darker = sorted((relative_luminance(color), relative_luminance(background)), reverse=True)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _with_contrast(color, background, minimum):
+    """A cor, misturada aos poucos com preto (fundo claro) ou branco (fundo escuro) até o contraste mínimo."""
+    if contrast_ratio(color, background) >= minimum:
+        return color
+    target = (0, 0, 0) if relative_luminance(background) > 0.179 else (255, 255, 255)
+    rgb = hex_to_rgb(color)
+    for step in range(1, 11):
+        mixed = "#%02X%02X%02X" % tuple(round(c + (t - c) * step / 10) for c, t in zip(rgb, target))
+        if contrast_ratio(mixed, background) >= minimum:
+            return mixed
+    return "#%02X%02X%02X" % target
+
+
+def ensure_contrast(style):
+    """Cópia do estilo com as cores no formato #RRGGBB e ajustadas só onde o contraste não passa."""
+    style = {key: "#" + value.lstrip("#").upper() if key.endswith("_hex") else value for key, value in style.items()}
+    background = style["bg_color_hex"]
+    for key, minimum in (("text_color_hex", WCAG_TEXT_RATIO), ("title_color_hex", WCAG_LARGE_RATIO),
+                         ("border_color_hex", WCAG_LARGE_RATIO)):
+        style[key] = _with_contrast(style[key], background, minimum)
+    return style
+
+
+@lru_cache(maxsize=None)
+def _palette_style(name):
+    return tuple(ensure_contrast(PALETTES[name]).items())
+
+
+def local_pdf_style(theme, poem_text=""):
+    """Estilo do PDF sem chamar a IA: paleta pelas palavras do tema (ou do poema) e contraste conferido."""
+    name = classify_theme(theme) or classify_theme(poem_text) or "padrao"
+    return dict(_palette_style(name))
+
+# Instruções fixas do estilo (vão uma vez por processo, ver ai_core.instruction_model); o pedido leva só o tema
+STYLE_INSTRUCTION = """Aja como um diretor de arte criando um layout para um poema infantil.
+Cada pedido traz o tema do poema. Sua tarefa é retornar um objeto JSON com uma paleta de design.
+**Chaves obrigatórias no JSON:**
+- "font": Escolha uma entre "Courier", "Helvetica", "Times".
+- "bg_color_hex": Uma cor de fundo suave em hexadecimal.
+- "text_color_hex": Uma cor de texto que contraste bem com o fundo.
+- "title_color_hex": Uma cor de destaque para o título.
+- "border_style": Escolha UM dos seguintes estilos de borda: "simples", "dupla", "estrelas".
+- "border_color_hex": Uma cor para a borda, em hexadecimal.
+
+Retorne APENAS o objeto JSON."""
+
 def generate_pdf_style(theme, poem_text):
-    """Gera um estilo de design para o PDF, incluindo um estilo de borda."""
-    model = configure_ai()
+    """Estilo do PDF pedido à IA, com contraste conferido; é o refinamento opcional do local_pdf_style."""
+    model = instruction_model("style", STYLE_INSTRUCTION)
     if model is None: 
-        return {
-            "font": "Helvetica", "bg_color_hex": "#F0F8FF", 
-            "text_color_hex": "#2F4F4F", "title_color_hex": "#FF6347",
-            "border_style": "simples", "border_color_hex": "#4682B4"
-        }
-
-    prompt = f"""
-    Aja como um diretor de arte criando um layout para um poema infantil.
-    O tema é "{theme}".
-    Sua tarefa é retornar um objeto JSON com uma paleta de design.
-    **Chaves obrigatórias no JSON:**
-    - "font": Escolha uma entre "Courier", "Helvetica", "Times".
-    - "bg_color_hex": Uma cor de fundo suave em hexadecimal.
-    - "text_color_hex": Uma cor de texto que contraste bem com o fundo.
-    - "title_color_hex": Uma cor de destaque para o título.
-    - "border_style": Escolha UM dos seguintes estilos de borda: "simples", "dupla", "estrelas".
-    - "border_color_hex": Uma cor para a borda, em hexadecimal.
-
-    Retorne APENAS o objeto JSON.
-    """
+        return local_pdf_style(theme, poem_text)
+
+    prompt = f'O tema é "{theme}".'
     try:
-        response = model.generate_content(prompt)
-        json_text = response.text.strip().replace("```json", "").replace("```", "").replace("python", "")
-        return json.loads(json_text)
+        return generate(model, prompt, schema=_STYLE_SCHEMA, parser=_check_style, tag="style")
     except Exception:
-        return {
-            "font": "Helvetica", "bg_color_hex": "#F0F8FF", 
-            "text_color_hex": "#2F4F4F", "title_color_hex": "#FF6347",
-            "border_style": "simples", "border_color_hex": "#4682B4"
-        }
+        return local_pdf_style(theme, poem_text)
+
+def _check_style(style):
+    """As cores precisam ser hexadecimais de verdade; senão a resposta volta para conserto."""
+    for key, value in style.items():
+        if key.endswith("_hex") and not re.fullmatch(r"#?[0-9A-Fa-f]{6}", value):
+            raise ValueError(f"{key}: cor inválida {value!r}")
+    return ensure_contrast(style)
+
+# PDFs prontos por (título, autor, texto, estilo, data do rodapé): baixar de novo não renderiza outra vez.
+PDF_CACHE_MAX_ENTRIES = 64
+
+
+@lru_cache(maxsize=256)
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+@lru_cache(maxsize=64)
+def _star_points(x, y, size=10):
+    outer_radius = size
+    inner_radius = size / 2.5
+    points = []
+    for i in range(10):
+        angle = i * 36 - 90
+        radius = outer_radius if i % 2 == 0 else inner_radius
+        points.append(
+            (x + radius * _cos(angle * 3.14159 / 180), 
+             y + radius * _sin(angle * 3.14159 / 180))
+        )
+    return tuple(points)
+
+
+@lru_cache(maxsize=32)
+def _border_paths(border_style, w, h):
+    """Geometria da borda calculada uma vez por (estilo de borda, tamanho da página).
+
+    Cada item é (tipo, espessura da linha, geometria); o header só repete os desenhos.
+    """
+    if border_style == 'dupla':
+        return (("rect", 1, (5, 5, w - 10, h - 10)), ("rect", 0.5, (7, 7, w - 14, h - 14)))
+    if border_style == 'estrelas':
+        corners = ((20, 20), (w - 20, 20), (20, h - 20), (w - 20, h - 20))
+        return tuple(("star", 0.2, _star_points(x, y)) for x, y in corners)
+    return (("rect", 1, (5, 5, w - 10, h - 10)),)  # Padrão 'simples'
+
 
 class PoemPDF(FPDF):
     def __init__(self, style_guide, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.use_style(style_guide)
+
+    def use_style(self, style_guide):
+        """Troca o estilo das próximas páginas (a antologia usa um estilo por poema)."""
         self.style = style_guide
-        self.bg_r, self.bg_g, self.bg_b = tuple(int(self.style['bg_color_hex'].lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        self.text_r, self.text_g, self.text_b = tuple(int(self.style['text_color_hex'].lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        self.title_r, self.title_g, self.title_b = tuple(int(self.style['title_color_hex'].lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        self.border_r, self.border_g, self.border_b = tuple(int(self.style.get('border_color_hex', '#4682B4').lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+        self.bg_r, self.bg_g, self.bg_b = hex_to_rgb(self.style['bg_color_hex'])
+        self.text_r, self.text_g, self.text_b = hex_to_rgb(self.style['text_color_hex'])
+        self.title_r, self.title_g, self.title_b = hex_to_rgb(self.style['title_color_hex'])
+        self.border_r, self.border_g, self.border_b = hex_to_rgb(self.style.get('border_color_hex', '#4682B4'))
 
     def header(self):
         self.set_fill_color(self.bg_r, self.bg_g, self.bg_b)
@@ -62,44 +239,17 @@ class PoemPDF(FPDF):
         self.cell(0, 10, f'Gerado pela Oficina de Rimas - {datetime.now().strftime("%d/%m/%Y")}', 0, 0, 'C')
 
     def draw_border(self):
-        style = self.style.get('border_style', 'simples')
         self.set_draw_color(self.border_r, self.border_g, self.border_b)
-        
-        if style == 'dupla':
-            self.set_line_width(1)
-            self.rect(5, 5, self.w - 10, self.h - 10)
-            self.set_line_width(0.5)
-            self.rect(7, 7, self.w - 14, self.h - 14)
-        elif style == 'estrelas':
-            self.draw_stars()
-        else: # Padrão 'simples'
-            self.set_line_width(1)
-            self.rect(5, 5, self.w - 10, self.h - 10)
-
-    def draw_stars(self):
-        self.set_line_width(0.2)
         self.set_fill_color(self.border_r, self.border_g, self.border_b)
-        self.draw_star(20, 20)
-        self.draw_star(self.w - 20, 20)
-        self.draw_star(20, self.h - 20)
-        self.draw_star(self.w - 20, self.h - 20)
-
-    def draw_star(self, x, y, size=10):
-        outer_radius = size
-        inner_radius = size / 2.5
-        points = []
-        for i in range(10):
-            angle = i * 36 - 90
-            radius = outer_radius if i % 2 == 0 else inner_radius
-            points.append(
-                (x + radius * _cos(angle * 3.14159 / 180), 
-                 y + radius * _sin(angle * 3.14159 / 180))
-            )
-        self.polygon(points, 'F')
-
-def create_poem_pdf(title, author, poem_text, style_guide):
-    pdf = PoemPDF(style_guide)
-    pdf.add_page()
+        for kind, line_width, geometry in _border_paths(self.style.get('border_style', 'simples'), self.w, self.h):
+            self.set_line_width(line_width)
+            if kind == "rect":
+                self.rect(*geometry)
+            else:
+                self.polygon(geometry, 'F')
+
+def write_poem(pdf, title, author, poem_text, style_guide):
+    """Escreve título, poema e autor na página atual do PDF."""
     pdf.set_font(style_guide['font'], 'B', 24)
     pdf.set_text_color(pdf.title_r, pdf.title_g, pdf.title_b)
     pdf.multi_cell(0, 15, title, align='C')
@@ -110,4 +260,29 @@ def create_poem_pdf(title, author, poem_text, style_guide):
     pdf.ln(10)
     pdf.set_font(style_guide['font'], 'I', 14)
     pdf.multi_cell(0, 10, f'- {author}', align='R')
+
+def create_poem_pdf(title, author, poem_text, style_guide, use_cache=True):
+    """Bytes do PDF do poema. use_cache=False renderiza sempre: é o que os lotes usam, já que cada
+    poema sai uma vez só e o cache do processo (herdado pelos processos filhos) só ocuparia memória."""
+    start = time.perf_counter()
+    if use_cache:
+        style_key = json.dumps(style_guide, sort_keys=True)
+        hits = _render_poem_pdf.cache_info().hits
+        pdf_bytes = _render_poem_pdf(title, author, poem_text, style_key, datetime.now().strftime("%d/%m/%Y"))
+        cache_hit = _render_poem_pdf.cache_info().hits > hits
+    else:
+        pdf_bytes, cache_hit = _build_pdf(title, author, poem_text, style_guide), False
+    metrics.record_call("pdf", time.perf_counter() - start, cache_hit=cache_hit,
+                        prompt_chars=len(poem_text), response_chars=len(pdf_bytes))
+    return pdf_bytes
+
+@lru_cache(maxsize=PDF_CACHE_MAX_ENTRIES)
+def _render_poem_pdf(title, author, poem_text, style_key, footer_date):
+    # footer_date só entra na chave: o rodapé é datado, então o cache não atravessa o dia.
+    return _build_pdf(title, author, poem_text, json.loads(style_key))
+
+def _build_pdf(title, author, poem_text, style_guide):
+    pdf = PoemPDF(style_guide)
+    pdf.add_page()
+    write_poem(pdf, title, author, poem_text, style_guide)
     return bytes(pdf.output())
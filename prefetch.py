@@ -0,0 +1,100 @@
+# Arquivo: prefetch.py
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from ai_core import background_priority
+from theme_generator import generate_progression_ideas
+from rhyme_engine import get_ai_rhymes, find_local_rhymes
+
+# Um único pool por processo, compartilhado por todas as sessões do Streamlit.
+PREFETCH_WORKERS = 8
+MAX_PREFETCHED_RHYME_WORDS = 3
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="oficina-prefetch")
+
+_STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "em", "na", "no", "nas", "nos",
+    "e", "ou", "com", "sem", "por", "para", "pra", "que", "se", "meu", "minha", "seu", "sua", "mais",
+    "muito", "como", "quando", "onde", "ao", "aos", "pelo", "pela", "entre", "sobre",
+}
+
+
+def likely_end_words(theme, limit=MAX_PREFETCHED_RHYME_WORDS):
+    """Palavras do tema que provavelmente vão fechar versos (substantivos e adjetivos do título)."""
+    words = []
+    for word in re.findall(r"[^\W\d_]+", theme.lower()):
+        if len(word) >= 3 and word not in _STOPWORDS and word not in words:
+            words.append(word)
+    return words[-limit:]
+
+
+def _in_background(fn, *args):
+    # O que é adiantado espera na fila atrás das chamadas de quem está esperando na tela
+    with background_priority():
+        return fn(*args)
+
+
+def _pdf_style(theme):
+    # pdf_generator (e o fpdf) só carregam aqui, em segundo plano, e não na primeira tela
+    from pdf_generator import generate_pdf_style, PDF_STYLE_AI
+    return generate_pdf_style(theme, "") if PDF_STYLE_AI else None
+
+
+def start_theme_prefetch(theme):
+    """Dispara em paralelo tudo o que as próximas etapas vão precisar para este tema."""
+    tasks = {
+        "ideas": _executor.submit(_in_background, generate_progression_ideas, theme),
+        "style": _executor.submit(_in_background, _pdf_style, theme),
+        "rhymes": {},
+    }
+    for word in likely_end_words(theme):
+        tasks["rhymes"][word] = _executor.submit(_in_background, get_ai_rhymes, word, theme, find_local_rhymes(word))
+    return tasks
+
+
+def cancel_prefetch(tasks):
+    """Cancela o que ainda não começou (ex.: o aluno trocou de tema)."""
+    if not tasks:
+        return
+    futures = [tasks.get("ideas"), tasks.get("style")] + list(tasks.get("rhymes", {}).values())
+    for future in futures:
+        if future is not None:
+            future.cancel()
+
+
+def ready_result(tasks, name):
+    """O resultado adiantado, se já estiver pronto; None se não terminou ou falhou (nunca espera)."""
+    future = tasks.get(name) if tasks else None
+    if future is None or not future.done() or future.cancelled():
+        return None
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+def await_task(tasks, name, fallback):
+    """Usa o resultado adiantado; sem tarefa pronta (ou se ela falhou), chama 'fallback' na hora.
+
+    Se a tarefa ainda não terminou, a chamada de 'fallback' é a mesma que ela faz: o
+    ai_core junta as duas numa só e a espera passa a ter a prioridade de quem está na tela.
+    """
+    future = tasks.get(name) if tasks else None
+    if future is None or not future.done():
+        if future is not None:
+            future.cancel()  # se ainda nem começou, não precisa mais
+        return fallback()
+    try:
+        return future.result()
+    except Exception:
+        return fallback()
+
+
+def has_prefetched_rhymes(tasks, word):
+    return bool(tasks) and word.strip().lower() in tasks.get("rhymes", {})
+
+
+def await_rhymes(tasks, word, theme, known_rhymes):
+    """Rimas com definições: usa a busca adiantada para a palavra, se houver."""
+    rhyme_tasks = tasks.get("rhymes", {}) if tasks else {}
+    return await_task(rhyme_tasks, word.strip().lower(), lambda: get_ai_rhymes(word, theme, known_rhymes))
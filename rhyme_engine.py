@@ -1,30 +1,486 @@
 # Arquivo: rhyme_engine.py
 
+import os
 import re
-import json
-from ai_core import configure_ai
-
-def get_ai_rhymes(word, theme):
-    """Pede à IA uma lista de rimas com regras fonéticas e definições."""
-    model = configure_ai()
-    if model is None: return [{"palavra": "Erro", "definicao": "Erro na configuração da IA."}]
-
-    prompt = f"""
-    Aja como um linguista computacional especialista em fonética do português brasileiro.
-    Sua única tarefa é gerar uma lista de palavras que rimam foneticamente com a palavra '{word}'.
-    REGRAS DE RIMA (NÃO PODEM SER QUEBRADAS):
-    1.  **SÍLABA TÔNICA:** A correspondência sonora da sílaba tônica é a regra MAIS IMPORTANTE.
-    2.  **TIMBRE DA VOGAL:** A vogal da sílaba tônica da rima DEVE ter o mesmo som (aberto ou fechado) que a da palavra-alvo. 'verde' (som ê) NÃO rima com 'ferve' (som é).
-    3.  **MONOSSÍLABOS:** Monossílabos tônicos (como 'lá') SÓ rimam com outros monossílabos tônicos ('cá') ou com a sílaba final de oxítonas ('maracujá').
-    CONTEXTO (SECUNDÁRIO): Se as regras acima forem cumpridas, tente sugerir palavras do tema '{theme}'.
-    Formato da Resposta: Retorne uma lista de objetos JSON com "palavra" e "definicao" (curta e simples para uma criança de 11 anos). Retorne no mínimo 8 sugestões.
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import lru_cache
+from ai_core import instruction_model, generate, generate_stream, iter_list_items
+
+WORDLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "palavras_ptbr.txt")
+
+_RHYMES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"palavra": {"type": "string"}, "definicao": {"type": "string"}},
+        "required": ["palavra", "definicao"],
+    },
+}
+
+_POEM_RHYMES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"alvo": {"type": "string"}, "rimas": _RHYMES_SCHEMA},
+        "required": ["alvo", "rimas"],
+    },
+}
+
+# Rimas do poema inteiro: no máximo tantas palavras por chamada, e tantas rimas locais
+# por palavra no prompt (para a resposta não ficar enorme).
+POEM_RHYMES_BATCH_SIZE = 12
+POEM_RHYMES_PER_WORD = 8
+# Rimas com definição já buscadas, por (palavra, tema): um verso novo só pede a palavra nova.
+WORD_RHYMES_CACHE_MAX_ENTRIES = 2000
+_word_rhymes_cache = OrderedDict()
+_word_rhymes_lock = threading.Lock()
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+_SCHEME_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+_VOWELS = set("aeiouáéíóúâêôãõàü")
+_ACCENTS = set("áéíóúâêô")
+_TILDES = set("ãõ")
+_PAROXYTONE_ENDINGS = ("a", "e", "o", "as", "es", "os", "am", "em", "ens")
+
+# Artigos, preposições, pronomes oblíquos... não têm sílaba tônica própria.
+_ATONIC_MONOSYLLABLES = {
+    "a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "na", "no", "nas", "nos",
+    "num", "numa", "ao", "aos", "à", "às", "que", "se", "me", "te", "lhe", "lhes", "vos",
+    "por", "com", "sem", "mas", "ou", "pra", "pro", "lo", "la", "los", "las",
+}
+
+# Timbre da vogal tônica (aberto "É/Ó" ou fechado "ê/ô") quando a grafia não tem acento.
+# Chave: a terminação a partir da vogal tônica, sem acentos e sem o "s" de plural.
+_TIMBRE_BY_ENDING = {
+    "or": "ô", "er": "ê", "ol": "Ó", "el": "É", "ez": "ê", "oz": "Ó",
+    "eza": "ê", "esa": "ê", "oso": "ô", "osa": "Ó", "ola": "Ó", "ovo": "ô", "ova": "Ó",
+    "ove": "Ó", "ora": "Ó", "oro": "ô", "orte": "Ó", "orta": "Ó", "orto": "ô", "orro": "ô",
+    "osto": "ô", "osta": "Ó", "ode": "Ó", "oda": "Ó", "ogo": "ô", "oga": "Ó", "oca": "Ó",
+    "oco": "ô", "ota": "Ó", "olha": "ô", "olho": "ô", "ela": "É", "elha": "ê", "elho": "ê",
+    "eca": "É", "eco": "É", "edo": "ê", "eda": "ê", "ede": "ê", "ega": "É", "ejo": "ê",
+    "eta": "ê", "ete": "ê", "eto": "É", "essa": "É", "esso": "É", "erra": "É", "erto": "É",
+    "erta": "É", "esta": "É", "esto": "É", "eve": "É", "eva": "É", "ebre": "É", "erve": "É",
+}
+# Vogais sem timbre conhecido rimam com qualquer um dos dois timbres na validação.
+_OPEN_OR_CLOSED = {"e": "Éê", "o": "Óô"}
+
+_STRESSED_VOWEL = {
+    "á": "a", "â": "a", "à": "a", "a": "a", "í": "i", "i": "i", "ú": "u", "u": "u", "ü": "u",
+    "é": "É", "ê": "ê", "ó": "Ó", "ô": "ô", "ã": "ã", "õ": "õ", "e": "e", "o": "o",
+}
+_HINTS = {"é": "É", "ê": "ê", "ó": "Ó", "ô": "ô"}
+
+RhymeInfo = namedtuple("RhymeInfo", "word key syllables")
+
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _is_onset_u(word, i):
+    """O 'u' de 'qu'/'gu' é mudo ('quero') ou semivogal de ataque ('quadro')."""
+    return word[i] == "u" and i > 0 and word[i - 1] in "qg"
+
+
+def _joins_previous(word, i):
+    """Diz se a vogal na posição i forma ditongo com a anterior (mesma sílaba)."""
+    ch, prev = word[i], word[i - 1]
+    if ch in "eo" and prev in _TILDES:  # ão, ãe, õe
+        return True
+    if ch not in "iu" or prev == ch:
+        return False
+    # Hiato antes de 'nh' ou de m/n/l/r/z que fecham a sílaba: ra-i-nha, ru-im, ca-ir.
+    rest = word[i + 1:i + 3]
+    if rest.startswith("nh"):
+        return False
+    if rest[:1] and rest[0] in "mnlrz" and (len(rest) == 1 or rest[1] not in _VOWELS):
+        return False
+    return True
+
+
+def _vowel_nuclei(word):
+    """Retorna as posições (início, fim) dos núcleos vocálicos, um por sílaba."""
+    nuclei = []
+    i, n = 0, len(word)
+    while i < n:
+        if word[i] not in _VOWELS or _is_onset_u(word, i):
+            i += 1
+            continue
+        start = i
+        i += 1
+        while i < n and word[i] in _VOWELS and _joins_previous(word, i):
+            i += 1
+        nuclei.append((start, i))
+    return nuclei
+
+
+def _stressed_index(word, nuclei):
+    """Aplica as regras de acentuação para achar a sílaba tônica."""
+    for marks in (_ACCENTS, _TILDES):
+        for idx in range(len(nuclei) - 1, -1, -1):
+            start, end = nuclei[idx]
+            if any(c in marks for c in word[start:end]):
+                return idx
+    if len(nuclei) > 1 and word.endswith(_PAROXYTONE_ENDINGS):
+        return len(nuclei) - 2
+    return len(nuclei) - 1
+
+
+def _stressed_vowel(tail, hint):
+    vowel = _STRESSED_VOWEL[tail[0]]
+    nxt = tail[1:2]
+    if vowel not in "eoÉêÓô":
+        return vowel
+    closed = "ê" if vowel in "eÉê" else "ô"
+    # Vogal nasal (tempo, também) não distingue aberto e fechado.
+    if nxt and nxt in "mn" and (len(tail) == 2 or tail[2] not in _VOWELS):
+        return closed
+    if hint:
+        return _HINTS[hint]
+    if vowel not in "eo":
+        return vowel
+    if nxt and nxt in "iu":  # ditongos 'ei', 'eu', 'oi', 'ou' sem acento são fechados
+        return closed
+    ending = _strip_accents(tail)
+    if ending.endswith("s") and len(ending) > 2:
+        ending = ending[:-1]
+    return _TIMBRE_BY_ENDING.get(ending, vowel)
+
+
+def _phonetic(tail, stressed):
+    """Transcreve a terminação rimante numa forma fonética simplificada."""
+    out = [stressed]
+    i, n = 1, len(tail)
+    while i < n:
+        c, pair, nxt = tail[i], tail[i:i + 2], tail[i + 1:i + 2]
+        after = tail[i + 2:i + 3]
+        if pair in ("ch", "lh", "nh"):
+            out.append({"ch": "x", "lh": "λ", "nh": "ñ"}[pair])
+            i += 2
+            continue
+        if pair in ("qu", "gu") and after in ("e", "i", "é", "ê", "í"):
+            out.append("k" if c == "q" else "g")
+            i += 2
+            continue
+        if pair in ("sc", "xc") and after in ("e", "i", "é", "ê", "í"):
+            out.append("s")
+            i += 2
+            continue
+        if pair == "rr" or (c == "r" and i > 0 and tail[i - 1] in "nls"):
+            out.append("R")
+            i += 2 if pair == "rr" else 1
+            continue
+        at_end_or_consonant = not nxt or nxt not in _VOWELS
+        if c in _VOWELS:
+            v = _STRESSED_VOWEL[c] if c in _TILDES else _strip_accents(c)
+            if tail[i:].rstrip("s") == c and v in "eo":  # 'e' e 'o' finais átonos soam 'i' e 'u'
+                v = "i" if v == "e" else "u"
+            out.append(v)
+        elif c in "cg":
+            soft = nxt in ("e", "i", "é", "ê", "í")
+            out.append(("s" if c == "c" else "j") if soft else ("k" if c == "c" else "g"))
+        elif c == "ç":
+            out.append("s")
+        elif c == "q":
+            out.append("k")
+        elif c == "h":
+            pass
+        elif c == "s":
+            between_vowels = i > 0 and tail[i - 1] in _VOWELS and nxt in _VOWELS
+            out.append("z" if between_vowels else "s")
+        elif c == "z":
+            out.append("s" if not nxt else "z")
+        elif c == "l":
+            out.append("u" if at_end_or_consonant else "l")
+        elif c == "m":
+            out.append("n" if at_end_or_consonant else "m")
+        elif c == "y":
+            out.append("i")
+        elif c == "w":
+            out.append("u")
+        elif c.isalpha():
+            out.append(c)
+        i += 1
+    key = []
+    for sound in out:
+        if not key or key[-1] != sound:
+            key.append(sound)
+    return "".join(key)
+
+
+def analyze_word(word, hint=None):
+    """Calcula a chave de rima (terminação fonética a partir da sílaba tônica)."""
+    word = word.strip().lower()
+    parts = [p for p in word.split("-") if p]
+    if not parts:
+        return None
+    last = "".join(c for c in parts[-1] if c.isalpha())
+    nuclei = _vowel_nuclei(last)
+    if not nuclei:
+        return None
+    start = nuclei[_stressed_index(last, nuclei)][0]
+    tail = last[start:]
+    key = _phonetic(tail, _stressed_vowel(tail, hint))
+    syllables = sum(len(_vowel_nuclei(p)) for p in parts)
+    return RhymeInfo(word, key, syllables)
+
+
+@lru_cache(maxsize=8192)
+def word_stress(word):
+    """Sílabas gramaticais da palavra e a posição da tônica (0 = primeira sílaba).
+
+    Monossílabos átonos (artigos, preposições...) voltam com a tônica None.
+    Palavras compostas ('beija-flor') contam todas as partes; a tônica é a da última.
     """
+    word = word.strip().lower()
+    parts = ["".join(c for c in p if c.isalpha()) for p in word.split("-")]
+    nuclei = [_vowel_nuclei(p) for p in parts if p]
+    count = sum(len(n) for n in nuclei)
+    if not count:
+        return None
+    if word in _ATONIC_MONOSYLLABLES or not nuclei[-1]:
+        return count, None
+    last = [p for p in parts if p][-1]
+    return count, count - len(nuclei[-1]) + _stressed_index(last, nuclei[-1])
+
+
+@lru_cache(maxsize=1)
+def _rhyme_index():
+    """Lê a lista de palavras uma única vez e agrupa tudo pela chave de rima."""
+    by_key = defaultdict(list)
+    by_word = {}
+    with open(WORDLIST_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            word, _, hint = line.partition("|")
+            word = word.strip().lower()
+            if word in by_word or word in _ATONIC_MONOSYLLABLES:
+                continue
+            info = analyze_word(word, hint.strip() or None)
+            if info:
+                by_word[word] = info
+                by_key[info.key].append(info)
+    # Palavras curtas primeiro: monossílabos tônicos aparecem antes das oxítonas.
+    by_key = {k: tuple(sorted(v, key=lambda r: (r.syllables, r.word))) for k, v in by_key.items()}
+    return by_key, by_word
+
+
+@lru_cache(maxsize=8192)
+def _word_info(word):
+    word = word.strip().lower()
+    if word in _ATONIC_MONOSYLLABLES:
+        return None
+    return _rhyme_index()[1].get(word) or analyze_word(word)
+
+
+def rhymes_with(word, other):
+    """Verifica se duas palavras rimam segundo as regras de sílaba tônica e timbre."""
+    a, b = _word_info(word), _word_info(other)
+    if not a or not b or a.key[1:] != b.key[1:]:
+        return False
+    va, vb = a.key[0], b.key[0]
+    return va == vb or vb in _OPEN_OR_CLOSED.get(va, "") or va in _OPEN_OR_CLOSED.get(vb, "")
+
+
+def find_local_rhymes(word, limit=30):
+    """Busca rimas no índice local, sem chamar a IA."""
+    info = _word_info(word)
+    if info is None:
+        return []
+    rhymes = [r.word for r in _rhyme_index()[0].get(info.key, ()) if r.word != info.word]
+    return rhymes[:limit]
+
+
+_RHYME_RULES = """REGRAS DE RIMA (NÃO PODEM SER QUEBRADAS):
+1.  **SÍLABA TÔNICA:** A correspondência sonora da sílaba tônica é a regra MAIS IMPORTANTE.
+2.  **TIMBRE DA VOGAL:** A vogal da sílaba tônica da rima DEVE ter o mesmo som (aberto ou fechado) que a da palavra-alvo. 'verde' (som ê) NÃO rima com 'ferve' (som é).
+3.  **MONOSSÍLABOS:** Monossílabos tônicos (como 'lá') SÓ rimam com outros monossílabos tônicos ('cá') ou com a sílaba final de oxítonas ('maracujá')."""
+
+# Instruções fixas: vão uma vez por processo como system instruction (ver ai_core.instruction_model)
+# e o prompt de cada pedido leva só a palavra, o tema e as rimas já conhecidas.
+RHYMES_INSTRUCTION = f"""Aja como um linguista computacional especialista em fonética do português brasileiro.
+Cada pedido traz uma palavra e um tema. Se o pedido listar rimas que já encontramos, escreva uma definição para CADA uma delas e sugira até 6 rimas novas, de preferência ligadas ao tema. Senão, gere uma lista de palavras que rimam foneticamente com a palavra.
+{_RHYME_RULES}
+CONTEXTO (SECUNDÁRIO): Se as regras acima forem cumpridas, tente sugerir palavras do tema.
+Formato da Resposta: Retorne uma lista de objetos JSON com "palavra" e "definicao" (curta e simples para uma criança de 11 anos). Retorne no mínimo 8 sugestões."""
+
+POEM_RHYMES_INSTRUCTION = f"""Aja como um linguista computacional especialista em fonética do português brasileiro.
+Cada pedido traz um tema e uma lista de palavras-alvo. Para CADA palavra-alvo, escreva uma definição para cada rima que já temos e sugira até 4 rimas novas, de preferência ligadas ao tema. Se não tivermos rimas para a palavra, sugira pelo menos 6.
+{_RHYME_RULES}
+Formato da Resposta: Retorne uma lista JSON com um objeto por palavra-alvo, com "alvo" (a palavra-alvo) e "rimas" (lista de objetos com "palavra" e "definicao", curta e simples para uma criança de 11 anos)."""
+
+
+def _rhyme_prompt(word, theme, known_rhymes):
+    prompt = f"Palavra: '{word}'. Tema: '{theme}'.\n"
+    if known_rhymes:
+        prompt += f"Já encontramos estas rimas para '{word}': {', '.join(known_rhymes)}.\n"
+    return prompt
+
+
+def get_ai_rhymes(word, theme, known_rhymes=None):
+    """Pede à IA definições para as rimas já encontradas e rimas extras do tema."""
+    known_rhymes = list(known_rhymes or [])
+    fallback = [{"palavra": r, "definicao": ""} for r in known_rhymes]
+    model = instruction_model("rhymes", RHYMES_INSTRUCTION)
+    if model is None:
+        return fallback or [{"palavra": "Erro", "definicao": "Erro na configuração da IA."}]
+
+    prompt = _rhyme_prompt(word, theme, known_rhymes)
     try:
         generation_config = {"temperature": 0.8}
-        response = model.generate_content(prompt, generation_config=generation_config)
-        json_text = response.text.strip().replace("```json", "").replace("```", "").replace("python", "")
-        rhymes = json.loads(json_text)
+        rhymes = generate(model, prompt, generation_config, schema=_RHYMES_SCHEMA, tag="rhymes")
         rhymes = [r for r in rhymes if r['palavra'].lower() != word.lower()]
+        if known_rhymes:
+            rhymes = _merge_rhymes(word, known_rhymes, rhymes)
         return rhymes if rhymes else [{"palavra": "Puxa!", "definicao": f"O Assistente não encontrou rimas para '{word}'."}]
     except Exception:
-        return [{"palavra": "Erro", "definicao": f"O Assistente teve um problema para buscar rimas."}]
+        return fallback or [{"palavra": "Erro", "definicao": f"O Assistente teve um problema para buscar rimas."}]
+
+
+def stream_ai_rhymes(word, theme, known_rhymes=None):
+    """Como get_ai_rhymes, mas devolve cada rima assim que a IA termina de escrevê-la.
+
+    Para as rimas já conhecidas, o item que chega traz a definição; as extras só
+    aparecem se rimarem de verdade com a palavra.
+    """
+    known_rhymes = list(known_rhymes or [])
+    model = instruction_model("rhymes", RHYMES_INSTRUCTION)
+    if model is None:
+        if not known_rhymes:
+            yield {"palavra": "Erro", "definicao": "Erro na configuração da IA."}
+        return
+
+    known = {r.lower() for r in known_rhymes}
+    seen = set()
+    chunks = generate_stream(model, _rhyme_prompt(word, theme, known_rhymes), {"temperature": 0.8}, schema=_RHYMES_SCHEMA, tag="rhymes")
+    try:
+        for rhyme in iter_list_items(chunks):
+            if not isinstance(rhyme, dict) or not rhyme.get('palavra'):
+                continue
+            palavra = str(rhyme['palavra']).strip()
+            lower = palavra.lower()
+            if lower == word.lower() or lower in seen:
+                continue
+            if known and lower not in known and not rhymes_with(word, palavra):
+                continue
+            seen.add(lower)
+            yield {"palavra": palavra, "definicao": rhyme.get('definicao', "")}
+    except Exception:
+        if not seen and not known_rhymes:
+            yield {"palavra": "Erro", "definicao": "O Assistente teve um problema para buscar rimas."}
+        return
+    if not seen and not known_rhymes:
+        yield {"palavra": "Puxa!", "definicao": f"O Assistente não encontrou rimas para '{word}'."}
+
+
+def _merge_rhymes(word, known_rhymes, ai_rhymes):
+    """Mantém a ordem do índice local e só aceita extras da IA que rimam de verdade."""
+    definitions = {r['palavra'].lower(): r.get('definicao', "") for r in ai_rhymes}
+    merged = [{"palavra": r, "definicao": definitions.pop(r.lower(), "")} for r in known_rhymes]
+    extras = [r for r in ai_rhymes if r['palavra'].lower() in definitions and rhymes_with(word, r['palavra'])]
+    return merged + extras
+
+
+def verse_end_words(poem_text):
+    """Última palavra de cada verso: [(índice da linha, palavra)], pulando linhas sem palavras."""
+    ends = []
+    for i, line in enumerate(poem_text.split('\n')):
+        words = _WORD_RE.findall(line)
+        if words:
+            ends.append((i, words[-1].lower()))
+    return ends
+
+
+def rhyme_scheme(poem_text):
+    """Esquema de rimas por estrofe (ex.: ["AABB", "ABAB"]), calculado só com o índice local.
+
+    As letras recomeçam em cada estrofe; um verso que não rima com nenhum outro
+    também ganha a sua letra (como em ABCB).
+    """
+    schemes = []
+    for stanza in re.split(r"\n\s*\n", poem_text):
+        letters = scheme_letters([word for _, word in verse_end_words(stanza)])
+        if letters:
+            schemes.append(letters)
+    return schemes
+
+
+def scheme_letters(end_words):
+    """Letras do esquema para uma sequência de palavras finais (uma estrofe)."""
+    letters, groups = [], []
+    for word in end_words:
+        for letter, first in groups:
+            if word == first or rhymes_with(word, first):
+                letters.append(letter)
+                break
+        else:
+            letter = _SCHEME_LETTERS[len(groups) % len(_SCHEME_LETTERS)]
+            groups.append((letter, word))
+            letters.append(letter)
+    return "".join(letters)
+
+
+def _poem_rhymes_prompt(words, theme, known):
+    targets = "\n".join(
+        f"- '{word}'" + (f" (já temos: {', '.join(known[word])})" if known[word] else "") for word in words
+    )
+    return f"Tema: '{theme}'.\nPalavras-alvo:\n{targets}\n"
+
+
+def _cached_word_rhymes(word, theme):
+    with _word_rhymes_lock:
+        rhymes = _word_rhymes_cache.get((word, theme))
+        if rhymes is not None:
+            _word_rhymes_cache.move_to_end((word, theme))
+        return rhymes
+
+
+def _store_word_rhymes(word, theme, rhymes):
+    with _word_rhymes_lock:
+        _word_rhymes_cache[(word, theme)] = rhymes
+        _word_rhymes_cache.move_to_end((word, theme))
+        while len(_word_rhymes_cache) > WORD_RHYMES_CACHE_MAX_ENTRIES:
+            _word_rhymes_cache.popitem(last=False)
+
+
+def get_poem_rhymes(poem_text, theme):
+    """Rimas com definições para a última palavra de todos os versos, numa chamada à IA por lote.
+
+    Devolve {palavra: [{"palavra", "definicao"}]}. As palavras se repetem só uma vez,
+    as já buscadas saem do cache e, sem a IA, ficam as rimas do índice local sem definição.
+    """
+    words = list(dict.fromkeys(word for _, word in verse_end_words(poem_text) if word not in _ATONIC_MONOSYLLABLES))
+    known = {word: find_local_rhymes(word, limit=POEM_RHYMES_PER_WORD) for word in words}
+    result, pending = {}, []
+    for word in words:
+        cached = _cached_word_rhymes(word, theme)
+        if cached is not None:
+            result[word] = cached
+        else:
+            pending.append(word)
+    model = instruction_model("poem_rhymes", POEM_RHYMES_INSTRUCTION) if pending else None
+    for start in range(0, len(pending), POEM_RHYMES_BATCH_SIZE):
+        batch = pending[start:start + POEM_RHYMES_BATCH_SIZE]
+        answered = {}
+        if model is not None:
+            try:
+                entries = generate(model, _poem_rhymes_prompt(batch, theme, known), {"temperature": 0.8},
+                                   schema=_POEM_RHYMES_SCHEMA, tag="rhymes")
+                answered = {str(e['alvo']).strip().lower(): e['rimas'] for e in entries}
+            except Exception:
+                answered = {}
+        for word in batch:
+            if word not in answered:
+                result[word] = [{"palavra": r, "definicao": ""} for r in known[word]]
+                continue
+            rhymes = [r for r in answered[word] if r['palavra'].strip().lower() != word]
+            if known[word]:
+                rhymes = _merge_rhymes(word, known[word], rhymes)
+            result[word] = rhymes
+            _store_word_rhymes(word, theme, rhymes)
+    return {word: result[word] for word in words}
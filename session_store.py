@@ -0,0 +1,289 @@
+# Arquivo: session_store.py
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from metrics import metrics
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+BLOB_DIR = os.environ.get("OFICINA_BLOB_DIR", os.path.join(_CACHE_DIR, "blobs"))
+BLOB_MAX_BYTES = int(os.environ.get("OFICINA_BLOB_MAX_BYTES", 256 * 1024 * 1024))
+BLOB_TTL_SECONDS = 2 * 60 * 60  # um PDF sem download por 2 horas sai do disco
+DRAFTS_PATH = os.environ.get("OFICINA_DRAFTS_PATH", os.path.join(_CACHE_DIR, "rascunhos.sqlite3"))
+DRAFT_FLUSH_SECONDS = 5  # as gravações de rascunho desse intervalo vão para o disco numa transação só
+DRAFT_TTL_SECONDS = 30 * 24 * 60 * 60
+DRAFT_CLAIMS_PRUNE_AT = 1000  # acima disso, os donos que já saíram são esquecidos
+SESSION_MEMORY_LIMIT = int(os.environ.get("OFICINA_SESSION_MEMORY_LIMIT", 512 * 1024))
+
+# O que sai da sessão quando ela passa do limite, nesta ordem; tudo pode ser pedido de novo
+# (o cache de respostas da IA deixa barato) e o valor é o "vazio" que o app já entende.
+DISPOSABLE_KEYS = {"poem_rhymes": None, "rhymes": None, "theme_suggestions": []}
+
+_HANDLE_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class BlobStore:
+    """Blobs grandes (PDFs) em disco, com LRU por tamanho total e validade; a sessão guarda só o handle."""
+
+    def __init__(self, directory, max_bytes, ttl_seconds):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.index = OrderedDict()  # handle -> (bytes, último acesso), do mais antigo para o mais recente
+        self.total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _path(self, handle):
+        return os.path.join(self.directory, f"{handle}.bin")
+
+    def _load(self):
+        """Na primeira chamada, lê o que já estava no disco (os PDFs sobrevivem a um reinício)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            handle, extension = os.path.splitext(name)
+            if extension == ".bin" and _HANDLE_RE.fullmatch(handle):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, handle, stat.st_size))
+        for accessed, handle, size in sorted(entries):
+            self.index[handle] = (size, accessed)
+            self.total_bytes += size
+
+    def _discard(self, handle):
+        size, _ = self.index.pop(handle)
+        self.total_bytes -= size
+        self.evictions += 1
+        try:
+            os.remove(self._path(handle))
+        except OSError:
+            pass
+
+    def _evict(self, now):
+        # Em ordem de acesso: os vencidos estão sempre no começo
+        while self.index:
+            handle, (_, accessed) = next(iter(self.index.items()))
+            if now - accessed < self.ttl_seconds and self.total_bytes <= self.max_bytes:
+                break
+            self._discard(handle)
+
+    def put(self, data):
+        """Grava os bytes e devolve o handle (hash do conteúdo: o mesmo PDF é gravado uma vez só)."""
+        handle = hashlib.sha256(data).hexdigest()[:32]
+        now = time.time()
+        with self._lock:
+            self._load()
+            if handle in self.index:
+                self.index[handle] = (len(data), now)
+                self.index.move_to_end(handle)
+                return handle
+            temporary = f"{self._path(handle)}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self._path(handle))
+            self.index[handle] = (len(data), now)
+            self.total_bytes += len(data)
+            self._evict(now)
+        return handle
+
+    def get(self, handle):
+        """Os bytes do handle, ou None se já saíram do disco."""
+        if not handle or not _HANDLE_RE.fullmatch(handle):
+            return None
+        now = time.time()
+        with self._lock:
+            self._load()
+            self._evict(now)
+            if handle not in self.index:
+                return None
+            try:
+                with open(self._path(handle), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(handle))
+            except OSError:
+                self._discard(handle)
+                return None
+            self.index[handle] = (len(data), now)
+            self.index.move_to_end(handle)
+            return data
+
+    def stats(self):
+        with self._lock:
+            return {"blobs": len(self.index), "bytes": self.total_bytes, "evictions": self.evictions}
+
+
+class DraftStore:
+    """Rascunhos (poema e tema) em SQLite; as gravações se juntam em memória e vão para o disco juntas."""
+
+    def __init__(self, path, flush_seconds, ttl_seconds):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.ttl_seconds = ttl_seconds
+        self.pending = {}  # id do rascunho -> (poema, tema, quando)
+        self.saves = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._db = None
+
+    def _connection(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS drafts ("
+                "id TEXT PRIMARY KEY, poem_text TEXT NOT NULL, chosen_theme TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+        return self._db
+
+    def save(self, draft_id, poem_text, chosen_theme):
+        """Guarda a versão mais recente; a gravação no disco só acontece no próximo flush."""
+        with self._lock:
+            self.pending[draft_id] = (poem_text, chosen_theme, time.time())
+            self.saves += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            batch, self.pending = self.pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not batch:
+                return
+            try:
+                db = self._connection()
+                db.executemany(
+                    "INSERT OR REPLACE INTO drafts (id, poem_text, chosen_theme, updated) VALUES (?, ?, ?, ?)",
+                    [(draft_id, *entry) for draft_id, entry in batch.items()],
+                )
+                db.execute("DELETE FROM drafts WHERE updated < ?", (time.time() - self.ttl_seconds,))
+                db.commit()
+                self.rows_written += len(batch)
+                self.flushes += 1
+            except sqlite3.Error:
+                # Sem disco, o rascunho volta para a fila e tenta de novo no próximo flush
+                for draft_id, entry in batch.items():
+                    self.pending.setdefault(draft_id, entry)
+
+    def load(self, draft_id):
+        """(poema, tema) do rascunho, ou None."""
+        with self._lock:
+            entry = self.pending.get(draft_id)
+            if entry:
+                return entry[0], entry[1]
+            try:
+                row = self._connection().execute(
+                    "SELECT poem_text, chosen_theme FROM drafts WHERE id = ? AND updated >= ?",
+                    (draft_id, time.time() - self.ttl_seconds),
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        return tuple(row) if row else None
+
+    def delete(self, draft_id):
+        with self._lock:
+            self.pending.pop(draft_id, None)
+            try:
+                db = self._connection()
+                db.execute("DELETE FROM drafts WHERE id = ?", (draft_id,))
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self.pending), "saves": self.saves,
+                    "rows_written": self.rows_written, "flushes": self.flushes}
+
+
+def _session_is_live(session_id):
+    """Diz se a sessão do Streamlit ainda está conectada (fora do servidor, nenhuma está)."""
+    from streamlit import runtime
+    return runtime.exists() and runtime.get_instance().is_active_session(session_id)
+
+
+class DraftClaims:
+    """Qual sessão do app está com cada rascunho aberto.
+
+    O id do rascunho vai na URL, e a URL é copiada (o professor manda a sua para a turma): uma
+    sessão só fica com o id se nenhuma outra sessão conectada já estiver com ele.
+    """
+
+    def __init__(self, is_live, prune_at):
+        self.is_live = is_live
+        self.prune_at = prune_at
+        self.owners = {}  # id do rascunho -> id da sessão
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def claim(self, draft_id, session_id):
+        """True se a sessão pode usar o rascunho (e passa a ser a dona dele)."""
+        with self._lock:
+            owner = self.owners.get(draft_id)
+            if owner is not None and owner != session_id and self.is_live(owner):
+                self.refused += 1
+                return False
+            self.owners[draft_id] = session_id
+            if len(self.owners) > self.prune_at:
+                self.owners = {d: s for d, s in self.owners.items() if s == session_id or self.is_live(s)}
+            return True
+
+
+blob_store = BlobStore(BLOB_DIR, BLOB_MAX_BYTES, BLOB_TTL_SECONDS)
+draft_store = DraftStore(DRAFTS_PATH, DRAFT_FLUSH_SECONDS, DRAFT_TTL_SECONDS)
+atexit.register(draft_store.flush)  # num desligamento normal, nada que estava na fila se perde
+
+
+draft_claims = DraftClaims(_session_is_live, DRAFT_CLAIMS_PRUNE_AT)
+
+
+def new_draft_id():
+    return uuid.uuid4().hex
+
+
+def claim_draft_id(requested, session_id):
+    """O id do rascunho da sessão: o pedido na URL, se nenhuma outra sessão conectada estiver com ele, ou um novo."""
+    if requested and draft_claims.claim(requested, session_id):
+        return requested
+    draft_id = new_draft_id()
+    draft_claims.claim(draft_id, session_id)
+    return draft_id
+
+
+def session_footprint(state):
+    """Bytes aproximados que a sessão ocupa: o tamanho do JSON de cada valor guardado."""
+    total = 0
+    for key in list(state.keys()):
+        value = state.get(key)
+        total += len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    return total
+
+
+def enforce_session_limit(state, limit=SESSION_MEMORY_LIMIT):
+    """Mantém a sessão abaixo do limite descartando o que dá para refazer; registra o tamanho nas métricas."""
+    size = session_footprint(state)
+    for key, empty in DISPOSABLE_KEYS.items():
+        if size <= limit:
+            break
+        if state.get(key):
+            state[key] = empty
+            size = session_footprint(state)
+            metrics.increment("session_trims", "sessao")
+    metrics.observe("session_bytes", "sessao", size)
+    return size
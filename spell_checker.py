@@ -1,48 +1,403 @@
 # Arquivo: spell_checker.py (VERSÃO FINAL - Correção do Bug de "Nenhum Erro")
 
+import os
 import re
-import json
-from ai_core import configure_ai
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from ai_core import instruction_model, generate
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LEXICON_PATH = os.path.join(_DATA_DIR, "lexico_ptbr.txt")
+RHYME_WORDLIST_PATH = os.path.join(_DATA_DIR, "palavras_ptbr.txt")
+# Dicionário completo do sistema (pacote 'wbrazilian', listado em packages.txt), quando instalado.
+SYSTEM_DICTIONARY_PATH = "/usr/share/dict/brazilian"
+
+MAX_EDIT_DISTANCE = 2
+_PREFIX_LENGTH = 7
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+_ACCENT_VARIANTS = {
+    "a": "áâãà", "e": "éê", "i": "í", "o": "óôõ", "u": "úü", "c": "ç",
+    "á": "aâã", "â": "aáã", "ã": "aáâ", "é": "eê", "ê": "eé", "í": "i", "ó": "oôõ", "ô": "oóõ", "õ": "oóô", "ú": "u", "ç": "c",
+}
+# Palavras que existem, mas costumam ser erro de digitação de outra: só a IA decide pelo contexto.
+_CONFUSABLE = {
+    "torar": ["torrar"], "mau": ["mal"], "esta": ["está"], "concerto": ["conserto"], "conserto": ["concerto"],
+    "cela": ["sela"], "sela": ["cela"], "acento": ["assento"], "assento": ["acento"], "senso": ["censo"],
+    "traz": ["trás"], "trás": ["traz"], "agente": ["a gente"], "afim": ["a fim"], "cessão": ["sessão", "seção"],
+}
+
+_ERRORS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "original": {"type": "string"},
+            "suggestions": {"type": "array", "items": {"type": "string"}},
+            "reason": {"type": "string"},
+            "verse_number": {"type": "integer"},
+        },
+        "required": ["original", "suggestions", "reason", "verse_number"],
+    },
+}
+
+_VERB_ENDINGS = {
+    "ar": ("o as a amos ais am ei aste ou astes aram ava avas ávamos áveis avam "
+           "arei arás ará aremos areis arão aria arias aríamos aríeis ariam "
+           "e es emos eis em asse asses ássemos ásseis assem ares armos arem ando ado ada ados adas").split(),
+    "er": ("o es e emos eis em i este eu estes eram ia ias íamos íeis iam "
+           "erei erás erá eremos ereis erão eria erias eríamos eríeis eriam "
+           "a as amos ais am esse esses êssemos êsseis essem eres ermos erem endo ido ida idos idas").split(),
+    "ir": ("o es e imos is em i iste iu istes iram ia ias íamos íeis iam "
+           "irei irás irá iremos ireis irão iria irias iríamos iríeis iriam "
+           "a as amos ais am isse isses íssemos ísseis issem ires irmos irem indo ido ida idos idas").split(),
+}
+
+# Resultado da revisão de cada verso, indexado pelo conteúdo da linha.
+# Só os versos novos ou editados voltam para a IA.
+VERSE_CACHE_MAX_ENTRIES = 2000
+_verse_cache = OrderedDict()
+_verse_cache_lock = threading.Lock()
+
+# Instruções fixas da revisão: vão uma vez por processo (ver ai_core.instruction_model); o prompt de
+# cada revisão leva só os versos numerados, quais revisar e as suspeitas do dicionário.
+SPELL_INSTRUCTION = """Aja como um professor de língua portuguesa experiente e compreensivo, revisando o rascunho de um poema de um aluno de 11 a 13 anos. O aluno pode usar gírias ou cometer erros de digitação comuns (ex: 'torar' querendo dizer 'torrar', 'ten' querendo dizer 'tem').
+
+Cada pedido traz trechos do poema com números de verso e diz quais versos revisar; os outros aparecem só como contexto. Identifique "problemas" de ortografia e de uso de letras maiúsculas nos versos pedidos. Se o pedido listar palavras suspeitas apontadas pelo dicionário, decida pelo contexto se são erros mesmo (gírias e nomes podem estar certos).
+
+**Regras de Correção (MUITO IMPORTANTE):**
+1.  **Foco:** Apenas ortografia (palavras escritas erradas) e uso de maiúsculas (início de verso e nomes próprios).
+2.  **Contexto é Rei:** As sugestões devem fazer sentido no contexto da frase.
+3.  **IGNORE A PONTUAÇÃO:** Não sugira correções de pontuação (vírgulas, pontos, etc.). Poemas têm liberdade poética.
+4.  **MÚLTIPLAS SUGESTÕES:** Para cada problema, ofereça uma lista de até 3 possíveis correções, com a mais provável primeiro.
+5.  **Comentários Simples:** Para cada problema, forneça um "motivo" (reason) muito curto e educativo.
+
+**Formato OBRIGATÓRIO da Resposta:**
+Retorne uma lista de objetos JSON. Cada objeto deve ter: "original", "suggestions" (UMA LISTA de strings), "reason", e "verse_number" (o número da linha que você vê no texto).
+Se não houver erros, retorne uma lista vazia []."""
+
+
+def _verse_key(line):
+    return hashlib.sha1(line.strip().encode("utf-8")).hexdigest()
+
+def _cached_verse(line):
+    key = _verse_key(line)
+    with _verse_cache_lock:
+        if key in _verse_cache:
+            _verse_cache.move_to_end(key)
+            return _verse_cache[key]
+    return None
+
+def _store_verse(line, errors):
+    """Guarda os erros de um verso (sem o número do verso, que depende da posição)."""
+    errors = [{k: v for k, v in e.items() if k != "verse_number"} for e in errors]
+    with _verse_cache_lock:
+        _verse_cache[_verse_key(line)] = errors
+        _verse_cache.move_to_end(_verse_key(line))
+        while len(_verse_cache) > VERSE_CACHE_MAX_ENTRIES:
+            _verse_cache.popitem(last=False)
+
+_DROP_ACUTE_AND_CIRCUMFLEX = str.maketrans("áéíóúâêôàü", "aeiouaeoau")
+
+def _keep_tilde(text):
+    """Tira acento agudo e circunflexo (que somem no diminutivo), mas mantém o til."""
+    return text.translate(_DROP_ACUTE_AND_CIRCUMFLEX)
+
+def _verb_forms(infinitive):
+    """Conjugações regulares, com os ajustes de grafia c/qu, g/gu, ç/c, c/ç e g/j."""
+    stem, kind = infinitive[:-2], infinitive[-2:]
+    if kind not in _VERB_ENDINGS:
+        return {infinitive}
+    forms = {infinitive}
+    for ending in _VERB_ENDINGS[kind]:
+        base = stem
+        if kind == "ar" and ending[0] == "e":
+            base = re.sub(r"c$", "qu", re.sub(r"g$", "gu", re.sub(r"ç$", "c", stem)))
+        elif kind != "ar" and ending[0] in "ao":
+            base = re.sub(r"gu$", "g", re.sub(r"g$", "j", re.sub(r"c$", "ç", stem)))
+        forms.add(base + ending)
+    return forms
+
+def _noun_forms(word):
+    """Plural, feminino e diminutivo (gera formas a mais, mas nunca rejeita uma correta)."""
+    singular = {word}
+    if word.endswith("o"):
+        singular.add(word[:-1] + "a")
+    elif word.endswith("or"):
+        singular.add(word + "a")
+    if word[-1] in "aeo":
+        stem = _keep_tilde(word[:-1])
+        singular |= {stem + "inho", stem + "inha"}
+    singular |= {_keep_tilde(word) + "zinho", _keep_tilde(word) + "zinha"}
+    forms = set()
+    for w in singular:
+        forms.add(w)
+        if w.endswith("ão"):
+            forms |= {w[:-2] + "ões", w[:-2] + "ães", w + "s"}
+        elif w[-1] in "aeiouáéíóúâêô":
+            forms.add(w + "s")
+        elif w.endswith("il"):
+            forms |= {w[:-1] + "s", w[:-2] + "eis"}
+        elif w.endswith(("al", "el", "ol", "ul")):
+            forms |= {w[:-1] + "is", w[:-2] + {"e": "é", "o": "ó"}.get(w[-2], w[-2]) + "is"}
+        elif w.endswith("m"):
+            forms.add(w[:-1] + "ns")
+        elif w[-1] in "rz":
+            forms.add(w + "es")
+    return forms
+
+def _deletes(word, distance):
+    """Variações da palavra com até 'distance' letras apagadas (índice SymSpell)."""
+    variants, frontier = {word}, {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+@lru_cache(maxsize=1)
+def _lexicon():
+    """Carrega o léxico uma única vez: formas conhecidas, nomes próprios e o índice de sugestões."""
+    words, proper, entries = set(), {}, set()
+
+    def add(entry, expand):
+        if entry[0].isupper():
+            proper.setdefault(entry.lower(), entry)
+            return
+        entries.add(entry)
+        words.update(expand(entry))
+
+    section = "palavras"
+    with open(LEXICON_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("## "):
+                section = line[3:].strip()
+            elif line and not line.startswith("#"):
+                add(line, {"nomes": _noun_forms, "verbos": _verb_forms}.get(section, lambda w: {w}))
+    with open(RHYME_WORDLIST_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                add(line.partition("|")[0].strip(), _noun_forms)
+    if os.path.exists(SYSTEM_DICTIONARY_PATH):
+        with open(SYSTEM_DICTIONARY_PATH, encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                entry = line.strip()
+                if entry:
+                    if entry[0].isupper():
+                        proper.setdefault(entry.lower(), entry)
+                    else:
+                        words.add(entry)
+
+    # Índice de deleções simétricas sobre as entradas do léxico básico (as mais comuns).
+    index = defaultdict(list)
+    for entry in entries:
+        for variant in _deletes(entry[:_PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+            index[variant].append(entry)
+    return frozenset(words), proper, dict(index)
+
+def _edit_distance(a, b, limit):
+    """Distância de Damerau-Levenshtein (transposições contam 1), com saída antecipada."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def _accent_variants(word):
+    """Trocas de acento e cedilha em até duas posições ('voce' → 'você', 'nao' → 'não')."""
+    variants = {word}
+    for _ in range(2):
+        variants |= {w[:i] + alt + w[i + 1:] for w in variants for i, c in enumerate(w) for alt in _ACCENT_VARIANTS.get(c, "")}
+    variants.discard(word)
+    return variants
+
+def suggest_corrections(word, limit=3):
+    """Sugere até 'limit' palavras do léxico próximas de 'word', as mais prováveis primeiro."""
+    words, _, index = _lexicon()
+    lower = word.lower()
+    # Erros só de acento vêm primeiro: são os mais comuns nos rascunhos.
+    ranked = {w: (0, 0, False) for w in _accent_variants(lower) if w in words}
+    for variant in _deletes(lower[:_PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+        for candidate in index.get(variant, ()):
+            if candidate in ranked:
+                continue
+            distance = _edit_distance(lower, candidate, MAX_EDIT_DISTANCE)
+            if distance <= MAX_EDIT_DISTANCE:
+                # Letra dobrada a mais ou a menos ('torar' → 'torrar') é tão comum quanto erro de acento.
+                slip = re.sub(r"(.)\1", r"\1", candidate) == re.sub(r"(.)\1", r"\1", lower)
+                ranked[candidate] = (0 if slip else distance, abs(len(candidate) - len(lower)), candidate[0] != lower[0])
+    ranked.pop(lower, None)
+    return sorted(ranked, key=lambda w: (ranked[w], w))[:limit]
+
+def _local_review(line):
+    """Pré-revisão sem IA: (erros certos, palavras suspeitas que precisam do contexto)."""
+    words, proper, _ = _lexicon()
+    errors, suspects = [], []
+    for n, match in enumerate(_WORD_RE.finditer(line)):
+        token = match.group(0)
+        lower = token.lower()
+        if n == 0 and token[0].islower() and (lower in words or lower in proper):
+            fixed = proper.get(lower, token[0].upper() + token[1:])
+            errors.append({"original": token, "suggestions": [fixed], "reason": "Todo verso começa com letra maiúscula."})
+            continue
+        if lower in words:
+            if lower in _CONFUSABLE:
+                suspects.append({"original": token, "suggestions": _CONFUSABLE[lower], "reason": "Essa palavra existe, mas confira se era essa mesma."})
+            continue
+        if lower in proper:
+            if token[0].islower():
+                errors.append({"original": token, "suggestions": [proper[lower]], "reason": "Nomes próprios começam com letra maiúscula."})
+            continue
+        if n > 0 and token[0].isupper():
+            continue  # no meio do verso, maiúscula desconhecida é provavelmente um nome
+        parts = lower.split("-")
+        if len(parts) > 1 and all(p in words or p in ("me", "te", "se", "lhe", "nos", "vos", "lo", "la", "los", "las") for p in parts):
+            continue
+        # No começo do verso a maiúscula é obrigatória e não diz nada: 'Ten' é suspeita como 'ten',
+        # e as sugestões mantêm a maiúscula
+        suggestions = suggest_corrections(token)
+        if token[0].isupper():
+            suggestions = [s[0].upper() + s[1:] for s in suggestions]
+        suspects.append({"original": token, "suggestions": suggestions, "reason": "Palavra não encontrada no dicionário."})
+    return errors, suspects
+
+def _context_excerpt(lines, targets):
+    """Monta o trecho numerado com os versos a revisar e um verso vizinho de cada lado."""
+    shown = sorted({j for i in targets for j in (i - 1, i, i + 1) if 0 <= j < len(lines)})
+    excerpt, previous = [], None
+    for j in shown:
+        if previous is not None and j != previous + 1:
+            excerpt.append("...")
+        excerpt.append(f"{j+1}: {lines[j]}")
+        previous = j
+    return "\n".join(excerpt)
 
 def find_errors(text):
-    """Pede à IA para revisar um texto e sugerir múltiplas correções contextuais."""
-    model = configure_ai()
-    if model is None: return []
+    """Revisa o poema verso a verso: o dicionário local resolve o que puder e só os versos suspeitos vão para a IA.
 
-    # --- INÍCIO DA CORREÇÃO ---
-    # 1. Criamos o texto numerado PRIMEIRO.
+    Se a IA não responder, as suspeitas do dicionário voltam com "confirmed": False.
+    """
     lines = text.split('\n')
-    numbered_text = "\n".join(f"{i+1}: {line}" for i, line in enumerate(lines))
+    pending = [i for i, line in enumerate(lines) if line.strip() and _cached_verse(line) is None]
 
-    # 2. Inserimos o texto numerado diretamente no prompt.
-    prompt = f"""
-    Aja como um professor de língua portuguesa experiente e compreensivo, revisando o rascunho de um poema de um aluno de 11 a 13 anos. O aluno pode usar gírias ou cometer erros de digitação comuns (ex: 'torar' querendo dizer 'torrar', 'ten' querendo dizer 'tem').
+    local = {i: _local_review(lines[i]) for i in pending}
+    suspicious = [i for i in pending if local[i][1]]
+    for i in pending:
+        if i not in suspicious:
+            _store_verse(lines[i], local[i][0])
 
-    Sua tarefa é ler o poema inteiro para entender o contexto e, em seguida, identificar "problemas" de ortografia e de uso de letras maiúsculas.
+    unconfirmed = {}
+    if suspicious:
+        reviewed = _review_verses(lines, suspicious, {i: local[i][1] for i in suspicious})
+        for i in suspicious:
+            known, suspects = local[i]
+            if reviewed is None:
+                # Sem a IA, mostra as sugestões do dicionário sem guardá-las (a próxima revisão tenta de novo),
+                # marcadas como não confirmadas: são palpites, não podem ser aplicadas sem alguém olhar
+                unconfirmed[i] = known + [dict(s, confirmed=False) for s in suspects
+                                          if s['suggestions'] and s['original'].lower() not in _CONFUSABLE]
+                continue
+            seen = {e['original'].lower() for e in known}
+            _store_verse(lines[i], known + [e for e in reviewed.get(i, []) if str(e.get('original', '')).lower() not in seen])
 
-    **Texto completo do poema (para Contexto, com números de verso):**
-    ---
-    {numbered_text}
-    ---
+    errors = []
+    for i, line in enumerate(lines):
+        verse_errors = unconfirmed.get(i) if i in unconfirmed else (_cached_verse(line) if line.strip() else None)
+        for error in verse_errors or []:
+            errors.append(dict(error, verse_number=i + 1))
+    return errors
 
-    **Regras de Correção (MUITO IMPORTANTE):**
-    1.  **Foco:** Apenas ortografia (palavras escritas erradas) e uso de maiúsculas (início de verso e nomes próprios).
-    2.  **Contexto é Rei:** As sugestões devem fazer sentido no contexto da frase.
-    3.  **IGNORE A PONTUAÇÃO:** Não sugira correções de pontuação (vírgulas, pontos, etc.). Poemas têm liberdade poética.
-    4.  **MÚLTIPLAS SUGESTÕES:** Para cada problema, ofereça uma lista de até 3 possíveis correções, com a mais provável primeiro.
-    5.  **Comentários Simples:** Para cada problema, forneça um "motivo" (reason) muito curto e educativo.
+def _review_verses(lines, pending, suspects=None):
+    """Envia os versos pendentes à IA e devolve {índice da linha: [erros]} (ou None se falhar)."""
+    model = instruction_model("spell", SPELL_INSTRUCTION)
+    if model is None: return None
 
-    **Formato OBRIGATÓRIO da Resposta:**
-    Retorne uma lista de objetos JSON. Cada objeto deve ter: "original", "suggestions" (UMA LISTA de strings), "reason", e "verse_number" (o número da linha que você vê no texto).
-    Se não houver erros, retorne uma lista vazia [].
-    """
-    # --- FIM DA CORREÇÃO ---
+    hints = ""
+    if suspects:
+        described = [
+            f"'{s['original']}' (verso {i+1}" + (f", talvez: {', '.join(s['suggestions'])})" if s['suggestions'] else ")")
+            for i in pending for s in suspects.get(i, [])
+        ]
+        hints = f"Palavras suspeitas apontadas pelo dicionário: {'; '.join(described)}.\n"
+
+    # 1. Só os versos a revisar e seus vizinhos (para contexto), mesmo quando o poema inteiro é novo:
+    # o dicionário local já descartou os versos sem suspeitas. As regras estão nas instruções fixas.
+    targets = ", ".join(str(i + 1) for i in pending)
+    prompt = f"Trechos do poema:\n{_context_excerpt(lines, pending)}\nRevise APENAS os versos {targets}.\n{hints}"
 
     try:
-        # 3. Enviamos o prompt corrigido para a IA
-        response = model.generate_content(prompt)
-        json_text = response.text.strip().replace("```json", "").replace("```", "").replace("python", "")
-        if not json_text or "[]" in json_text: return []
-        return json.loads(json_text)
+        # 3. Enviamos o prompt para a IA e devolvemos cada erro ao verso certo
+        errors = generate(model, prompt, schema=_ERRORS_SCHEMA, tag="spell")
     except Exception:
-        return []
+        return None
+    reviewed = {}
+    for error in errors:
+        i = _locate_verse(lines, pending, error)
+        if i is not None:
+            reviewed.setdefault(i, []).append(error)
+    return reviewed
+
+def _locate_verse(lines, pending, error):
+    """Confere o número de verso informado pela IA; se a palavra não estiver lá, procura nos versos revisados."""
+    original = str(error.get('original', ''))
+    try:
+        i = int(error.get('verse_number')) - 1
+    except (TypeError, ValueError):
+        i = None
+    pattern = re.compile(r'\b' + re.escape(original) + r'\b', re.IGNORECASE)
+    if i in pending and pattern.search(lines[i]):
+        return i
+    return next((j for j in pending if pattern.search(lines[j])), None)
+
+def apply_suggestion(text, errors, error, suggestion):
+    """Troca a palavra no verso do erro e atualiza a lista de erros localmente, sem chamar a IA."""
+    def replace_word(match):
+        word = match.group(0)
+        if suggestion != suggestion.lower():
+            return suggestion  # correções de maiúscula e nomes próprios entram como sugeridas
+        if word.isupper():
+            return suggestion.upper()
+        elif word.istitle():
+            return suggestion.title()
+        else:
+            return suggestion.lower()
+
+    lines = text.split('\n')
+    # O número do verso pode estar velho (o aluno mexeu no poema depois da revisão): procura a palavra
+    # no verso informado e, se não estiver lá, no resto do poema
+    i = _locate_verse(lines, list(range(len(lines))), error)
+    if i is None:
+        return text, errors
+    previous = lines[i]
+    lines[i], replaced = re.subn(r'\b' + re.escape(error['original']) + r'\b', replace_word, previous, count=1, flags=re.IGNORECASE)
+    if not replaced:
+        return text, errors
+
+    remaining = list(errors)
+    for k, e in enumerate(remaining):
+        if e['verse_number'] == error['verse_number'] and e['original'] == error['original']:
+            del remaining[k]
+            break
+    # O verso corrigido já nasce revisado: herda os erros guardados para o verso antes da troca, sem o
+    # corrigido. Se o verso antigo não foi revisado neste texto, não há o que herdar e nada é guardado.
+    reviewed = _cached_verse(previous)
+    if reviewed is not None:
+        inherited = list(reviewed)
+        for k, e in enumerate(inherited):
+            if str(e.get('original', '')).lower() == error['original'].lower():
+                del inherited[k]
+                break
+        _store_verse(lines[i], inherited)
+    return "\n".join(lines), remaining
@@ -0,0 +1,76 @@
+# Arquivo: tests/test_batch_pipeline.py
+#
+# Uma linha ruim no JSONL não pode derrubar o lote: vira um resultado de erro e o resto segue.
+# Roda sem chave de API (revisão só com o dicionário local e estilo local).
+# Uso: python -m pytest -q tests
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Caches do teste fora dos caches do app
+os.environ.setdefault("OFICINA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "oficina_testes", "respostas_ia.sqlite3"))
+os.environ.setdefault("OFICINA_BANK_PATH", os.path.join(tempfile.gettempdir(), "oficina_testes", "banco_aprendido.sqlite3"))
+
+from batch_pipeline import run_pipeline, RESULTS_FILENAME  # noqa: E402
+
+POEM = "meu cachorro olha a chuva\ncom o focinho na janela"
+
+
+def write_input(path):
+    lines = [
+        json.dumps({"id": "ok", "theme": "chuva", "title": "Chuva", "author": "Ana", "text": POEM}),
+        json.dumps({"id": "sem-titulo", "author": "Bia", "text": POEM}),
+        '{"id": "quebrado", "text": ',
+        json.dumps({"id": "sem-texto", "title": "Vazio", "author": "Caio"}),
+        json.dumps(["não", "é", "objeto"]),
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def read_results(out_dir):
+    with open(out_dir / RESULTS_FILENAME, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_bad_rows_become_error_results(tmp_path):
+    input_path, out_dir = tmp_path / "turma.jsonl", tmp_path / "saida"
+    write_input(input_path)
+
+    report = run_pipeline(str(input_path), str(out_dir), style_source="local", workers=2, log=lambda message: None)
+
+    assert report["counts"]["ok"] == 2
+    assert report["counts"]["erro"] == 3
+    results = {result["line"]: result for result in read_results(out_dir)}
+    assert sorted(results) == [1, 2, 3, 4, 5]
+    assert results[2]["status"] == "ok"
+    assert (out_dir / results[2]["pdf"]).exists()
+    assert all(results[line]["stage"] == "entrada" for line in (3, 4, 5))
+
+
+def test_resume_skips_finished_poems_after_bad_rows(tmp_path):
+    input_path, out_dir = tmp_path / "turma.jsonl", tmp_path / "saida"
+    write_input(input_path)
+    run_pipeline(str(input_path), str(out_dir), style_source="local", workers=2, log=lambda message: None)
+
+    report = run_pipeline(str(input_path), str(out_dir), style_source="local", workers=2, log=lambda message: None)
+
+    assert report["counts"]["skipped"] == 2
+    assert report["counts"].get("ok", 0) == 0
+    assert report["counts"]["erro"] == 3
+
+
+def test_unconfirmed_guesses_are_not_applied_without_the_model(tmp_path):
+    input_path, out_dir = tmp_path / "turma.jsonl", tmp_path / "saida"
+    input_path.write_text(json.dumps({"title": "Cão", "author": "Ana", "text": "meu cachoro late"}) + "\n",
+                          encoding="utf-8")
+
+    report = run_pipeline(str(input_path), str(out_dir), apply_suggestions=True, workers=1, log=lambda message: None)
+
+    [result] = read_results(out_dir)
+    assert result["text"] == "Meu cachoro late"  # só a maiúscula do verso, que não depende da IA
+    assert result["applied"] == 1
+    assert all(error.get("confirmed") is False for error in result["errors"])
+    assert report["warnings"]
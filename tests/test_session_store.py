@@ -0,0 +1,41 @@
+# Arquivo: tests/test_session_store.py
+#
+# O id do rascunho vai na URL: uma URL copiada de quem está com o app aberto não pode abrir o mesmo rascunho.
+# Uso: python -m pytest -q tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session_store  # noqa: E402
+from session_store import DraftClaims  # noqa: E402
+
+
+def test_copied_url_does_not_share_a_live_sessions_draft():
+    live = {"professor"}
+    claims = DraftClaims(lambda session_id: session_id in live, prune_at=1000)
+
+    assert claims.claim("rascunho-1", "professor")
+    assert not claims.claim("rascunho-1", "aluno-1")
+    assert not claims.claim("rascunho-1", "aluno-2")
+    assert claims.claim("rascunho-1", "professor")  # reruns da própria sessão
+
+
+def test_draft_is_taken_over_once_its_session_is_gone():
+    live = {"antes"}
+    claims = DraftClaims(lambda session_id: session_id in live, prune_at=1000)
+    claims.claim("rascunho-1", "antes")
+
+    live.clear()  # recarregou a página: a sessão antiga desconectou
+    assert claims.claim("rascunho-1", "depois")
+
+
+def test_claim_draft_id_falls_back_to_a_new_id(monkeypatch):
+    live = {"professor"}
+    monkeypatch.setattr(session_store, "draft_claims", DraftClaims(lambda s: s in live, prune_at=1000))
+
+    assert session_store.claim_draft_id("rascunho-1", "professor") == "rascunho-1"
+    other = session_store.claim_draft_id("rascunho-1", "aluno")
+    assert other != "rascunho-1"
+    assert session_store.claim_draft_id(other, "aluno") == other
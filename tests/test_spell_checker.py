@@ -0,0 +1,43 @@
+# Arquivo: tests/test_spell_checker.py
+#
+# Pré-revisão local da ortografia: a maiúscula do começo do verso não pode esconder um erro.
+# Usa o modelo falso dos benchmarks, que confirma as suspeitas que recebe.
+# Uso: python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("OFICINA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "oficina_testes", "respostas_ia.sqlite3"))
+
+import ai_core  # noqa: E402
+import spell_checker  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+
+
+def review(monkeypatch, text):
+    model = FakeGenerativeModel(latency=0.0, jitter=0.0)
+    monkeypatch.setattr(ai_core, "configure_ai", lambda: model)
+    ai_core.response_cache.clear()
+    with spell_checker._verse_cache_lock:
+        spell_checker._verse_cache.clear()
+    return spell_checker.find_errors(text)
+
+
+def test_capitalised_misspelling_at_verse_start_is_flagged(monkeypatch):
+    errors = review(monkeypatch, "Ten um gato no telhado\nCachoro no muro\nVoce sabe")
+
+    found = {error["original"]: error for error in errors}
+    assert {"Ten", "Cachoro", "Voce"} <= set(found)
+    assert found["Ten"]["verse_number"] == 1
+    assert found["Ten"]["suggestions"][0] == "Tem"
+    assert found["Voce"]["suggestions"][0] == "Você"
+
+
+def test_capitalised_word_mid_verse_is_still_taken_as_a_name(monkeypatch):
+    errors = review(monkeypatch, "O Xandinho corre na rua")
+
+    assert "Xandinho" not in {error["original"] for error in errors}
@@ -0,0 +1,271 @@
+# Arquivo: theme_bank.py
+
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+from metrics import metrics
+
+BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "banco_temas_ptbr.txt")
+LEARNED_PATH = os.environ.get(
+    "OFICINA_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "banco_aprendido.sqlite3"),
+)
+BANK_RESULTS = 10
+BANK_MIN_SCORE = 2.5      # nota BM25 mínima do melhor assunto
+BANK_MIN_COVERAGE = 0.5   # fração mínima das palavras do aluno que os assuntos escolhidos cobrem
+BANK_TOPIC_RATIO = 0.4    # assuntos com pelo menos 40% da nota do melhor entram na mistura de temas
+BANK_KEYWORD_WEIGHT = 2   # as palavras-chave contam em dobro: definem o assunto mais do que o texto dos temas
+BANK_MAX_TOPICS_MIXED = 3
+BANK_MAX_LEARNED = 5000
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+# Plurais mais comuns; o resto perde só o "s" final depois de vogal (árvores -> arvore)
+_PLURALS = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ns", "m"))
+
+# Assunto do banco: tokens é o Counter das palavras indexadas (palavras-chave e temas)
+Topic = namedtuple("Topic", "name tokens themes ideas")
+
+
+def _fold(text):
+    return "".join(c for c in unicodedata.normalize("NFD", text.lower()) if unicodedata.category(c) != "Mn")
+
+
+def _stem(token):
+    for suffix, replacement in _PLURALS:
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            return token[:-len(suffix)] + replacement
+    if len(token) > 3 and token.endswith("s") and token[-2] in "aeiou":
+        return token[:-1]
+    return token
+
+
+_STOPWORDS = {_fold(w) for w in """
+    a o as os um uma uns umas de da do das dos em na no nas nos num numa por pelo pela para pra com sem
+    e ou mas que se eu meu minha meus minhas me mim comigo muito muita muitos muitas mais menos bem
+    gosto gosta gostar gostei gostamos adoro adora amo ama curto curte prefiro quero sou é ser estar está
+    tenho tem ter ao aos à às isso esse essa este esta tudo todo toda todos todas quando como sobre
+    também ele ela eles elas nós voce você coisa coisas dia vez legal
+""".split()}
+
+
+def tokenize(text):
+    """Palavras sem acento, em minúsculas, sem as palavras vazias e com o plural reduzido."""
+    return [_stem(t) for t in _WORD_RE.findall(_fold(text)) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _parse_bank(path):
+    topics, current = [], None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("## "):
+                current = {"name": line[3:].strip(), "tokens": Counter(), "themes": [], "ideas": []}
+                topics.append(current)
+            elif current is None or not line or line.startswith("#"):
+                continue
+            elif line.startswith("palavras:"):
+                for _ in range(BANK_KEYWORD_WEIGHT):
+                    current["tokens"].update(tokenize(line[len("palavras:"):]))
+            elif line.startswith("tema:"):
+                theme = line[len("tema:"):].strip()
+                current["themes"].append(theme)
+                current["tokens"].update(tokenize(theme))
+            elif line.startswith("ideia:"):
+                current["ideas"].append(line[len("ideia:"):].strip())
+    return [Topic(**topic) for topic in topics]
+
+
+class ThemeBank:
+    """Assuntos com temas e ideias num índice invertido, ranqueados por BM25.
+
+    O banco curado (data/banco_temas_ptbr.txt) é somado ao que a IA já respondeu para interesses
+    e temas fora dele (guardado em SQLite), então a cauda longa encolhe com o uso.
+    """
+
+    def __init__(self, bank_path, learned_path, max_learned):
+        self.bank_path = bank_path
+        self.learned_path = learned_path
+        self.max_learned = max_learned
+        self._lock = threading.Lock()
+        self._db = None
+        self._loaded = False
+
+    def _reset_index(self):
+        self.topics = []
+        self.postings = defaultdict(dict)  # token -> {índice do assunto: frequência}
+        self.lengths = []
+        self.total_length = 0
+        self.learned = set()
+
+    def _connection(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.learned_path), exist_ok=True)
+            self._db = sqlite3.connect(self.learned_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS learned ("
+                "kind TEXT NOT NULL, query TEXT NOT NULL, items TEXT NOT NULL, created REAL NOT NULL, "
+                "PRIMARY KEY (kind, query))"
+            )
+        return self._db
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._reset_index()
+        for topic in _parse_bank(self.bank_path):
+            self._add(topic)
+        try:
+            rows = self._connection().execute(
+                "SELECT kind, query, items FROM learned ORDER BY created DESC LIMIT ?", (self.max_learned,)
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        for kind, query, items in rows:
+            self._add_learned(kind, query, json.loads(items))
+        self._loaded = True
+
+    def _add(self, topic):
+        index = len(self.topics)
+        self.topics.append(topic)
+        for token, frequency in topic.tokens.items():
+            self.postings[token][index] = frequency
+        length = sum(topic.tokens.values())
+        self.lengths.append(length)
+        self.total_length += length
+
+    def _add_learned(self, kind, query, items):
+        if (kind, query) in self.learned:
+            return
+        self.learned.add((kind, query))
+        tokens = Counter(tokenize(query))
+        if kind == "themes":
+            for item in items:
+                tokens.update(tokenize(item))
+        self._add(Topic(f"aprendido: {query}", tokens,
+                        items if kind == "themes" else [], items if kind == "ideas" else []))
+
+    def _rank(self, query):
+        """[(índice do assunto, nota BM25)], da maior nota para a menor."""
+        count = len(self.topics)
+        average = self.total_length / count if count else 0
+        scores = defaultdict(float)
+        for token in set(query):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / average)
+                scores[index] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])
+
+    def search(self, text, field, limit=BANK_RESULTS):
+        """Até 'limit' temas ou ideias ('field') para o texto, ou None se a confiança for baixa."""
+        query = tokenize(text)
+        if not query:
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            ranked = [(self.topics[i], score) for i, score in self._rank(query) if getattr(self.topics[i], field)]
+        if not ranked or ranked[0][1] < BANK_MIN_SCORE:
+            return None
+        # Ideias precisam combinar com o tema: só o melhor assunto. Temas podem misturar assuntos
+        # ("futebol e meu cachorro" traz temas dos dois).
+        mixed = 1 if field == "ideas" else BANK_MAX_TOPICS_MIXED
+        chosen = [topic for topic, score in ranked if score >= ranked[0][1] * BANK_TOPIC_RATIO][:mixed]
+        terms = set(query)
+        covered = {term for term in terms if any(term in topic.tokens for topic in chosen)}
+        if len(covered) / len(terms) < BANK_MIN_COVERAGE:
+            return None
+
+        # Dentro de cada assunto, primeiro o que repete palavras do aluno; o empate é sorteado com
+        # semente no próprio texto (o mesmo interesse sempre traz a mesma lista)
+        rng = random.Random(" ".join(sorted(terms)))
+        columns = []
+        for topic in chosen:
+            items = getattr(topic, field)
+            overlap = [len(terms.intersection(tokenize(item))) for item in items]
+            keys = [(-o, rng.random()) for o in overlap]
+            columns.append([item for _, item in sorted(zip(keys, items))])
+        results, seen = [], set()
+        for row in range(max(len(column) for column in columns)):
+            for column in columns:
+                if row < len(column) and _fold(column[row]) not in seen:
+                    seen.add(_fold(column[row]))
+                    results.append(column[row])
+        return results[:limit] if len(results) >= limit else None
+
+    def learn(self, kind, query, items):
+        """Guarda uma resposta da IA ('themes' para um interesse, 'ideas' para um tema) no banco."""
+        items = [item.strip() for item in items if isinstance(item, str) and item.strip()]
+        if len(items) < BANK_RESULTS // 2 or not tokenize(query):
+            return
+        with self._lock:
+            self._ensure_loaded()
+            if len(self.learned) >= self.max_learned:
+                return
+            try:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO learned (kind, query, items, created) VALUES (?, ?, ?, ?)",
+                    (kind, query, json.dumps(items, ensure_ascii=False), time.time()),
+                )
+                db.commit()
+            except sqlite3.Error:
+                pass  # sem disco, o que foi aprendido vale só até o servidor reiniciar
+            self._add_learned(kind, query, items)
+
+    def clear_learned(self):
+        """Esquece tudo o que veio da IA (o banco curado é relido na próxima busca)."""
+        with self._lock:
+            try:
+                db = self._connection()
+                db.execute("DELETE FROM learned")
+                db.commit()
+            except sqlite3.Error:
+                pass
+            self._loaded = False
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {"topics": len(self.topics), "learned": len(self.learned)}
+
+
+theme_bank = ThemeBank(BANK_PATH, LEARNED_PATH, BANK_MAX_LEARNED)
+
+
+def _search(text, field, tag):
+    start = time.perf_counter()
+    results = theme_bank.search(text, field)
+    if results:
+        metrics.record_call(tag, time.perf_counter() - start, prompt_chars=len(text))
+        metrics.increment("bank_hits", tag)
+    return results
+
+
+def search_themes(interest_text):
+    """10 temas do banco local para o interesse do aluno, ou None (aí a IA responde)."""
+    return _search(interest_text, "themes", "themes")
+
+
+def search_ideas(theme):
+    """10 ideias de progressão do banco local para o tema, ou None."""
+    return _search(theme, "ideas", "ideas")
+
+
+def learn_themes(interest_text, themes):
+    theme_bank.learn("themes", interest_text.strip(), themes)
+
+
+def learn_ideas(theme, ideas):
+    theme_bank.learn("ideas", theme.strip(), ideas)
@@ -1,67 +1,92 @@
 # Arquivo: theme_generator.py (VERSÃO FINAL - Correção do Erro de Inspiração)
 
-import re
-import json
-from ai_core import configure_ai
+from ai_core import instruction_model, generate, generate_stream, iter_list_items
+from theme_bank import search_themes, search_ideas, learn_themes, learn_ideas
+
+# Lista de textos (temas ou ideias); a IA responde em JSON neste formato
+_LIST_SCHEMA = {"type": "array", "items": {"type": "string"}, "min_items": 1}
+
+# Instruções fixas (vão uma vez por processo, ver ai_core.instruction_model); o pedido leva só o texto do aluno ou o tema
+THEMES_INSTRUCTION = """Aja como um gerador de ideias para um jovem escritor de 11 a 13 anos.
+A tarefa é criar 10 temas para um poema baseados nas palavras de inspiração que o aluno escreveu, enviadas em cada pedido.
+Sua Missão:
+Ofereça dez temas para um poema que se relacionem DIRETAMENTE com o que ele colocou. Os temas devem ser concretos, curtos e estimulantes.
+Formato OBRIGATÓRIO da Resposta:
+Retorne APENAS uma lista JSON contendo 10 strings."""
+
+IDEAS_INSTRUCTION = """Aja como um professor de escrita criativa experiente, guiando um aluno de 11 a 13 anos que tem pouco contato com poesia.
+Cada pedido traz o tema do poema. Sua tarefa é criar uma lista fixa de 10 ideias de como progredir na escrita.
+
+**Diretrizes de Estilo (MUITO IMPORTANTE):**
+1.  **Concretude com Lirismo Básico:** As ideias devem ser fáceis de entender e um pouco mais concretas.
+2.  **Foco nos Sentidos:** Incentive o aluno a pensar em cheiros, sons, cores e sensações relacionadas ao tema.
+3.  **Simplicidade:** Use um vocabulário direto e acessível, mas que desperte a imaginação.
+4.  **Formato de Pergunta ou Comando Criativo:** As ideias devem ser perguntas ou comandos criativos.
+5.  **NÃO ESCREVA VERSOS:** Apenas ideias.
+
+FORMATO DA RESPOSTA: Retorne APENAS uma lista JSON com 10 strings."""
+
+def _themes_prompt(interest_text):
+    return f'Palavras de Inspiração do Aluno: "{interest_text}"'
 
 def generate_themes(interest_text):
     """Gera 10 temas personalizados com base em um texto de interesse."""
-    model = configure_ai()
+    # Interesses comuns (futebol, jogos, bichos, família...) saem do banco local em milissegundos
+    local = search_themes(interest_text)
+    if local: return local
+    model = instruction_model("themes", THEMES_INSTRUCTION)
     if model is None: return ["Erro na configuração da IA."]
     
-    prompt = f"""
-    Aja como um gerador de ideias para um jovem escritor de 11 a 13 anos.
-    A tarefa é criar 10 temas para um poema baseados nas palavras que o aluno escreveu.
-    Palavras de Inspiração do Aluno:
-    "{interest_text}"
-    Sua Missão:
-    Ofereça dez temas para um poema que se relacionem DIRETAMENTE com o que ele colocou. Os temas devem ser concretos, curtos e estimulantes.
-    Formato OBRIGATÓRIO da Resposta:
-    Retorne APENAS uma lista Python válida contendo 10 strings.
-    """
+    prompt = _themes_prompt(interest_text)
     try:
-        response = model.generate_content(prompt)
-        match = re.search(r'\[.*\]', response.text, re.DOTALL)
-        if match:
-            list_str = match.group(0)
-            themes = eval(list_str)
-            if isinstance(themes, list) and len(themes) > 0:
-                return themes
+        themes = generate(model, prompt, schema=_LIST_SCHEMA, tag="themes")
+        learn_themes(interest_text, themes)
+        return themes
+    except ValueError:
         return ["O Assistente não conseguiu criar temas. Tente novamente."]
     except Exception as e:
         return [f"O Assistente teve um problema para criar temas. (Erro: {e})"]
 
+def stream_themes(interest_text):
+    """Como generate_themes, mas devolve cada tema assim que a IA termina de escrevê-lo."""
+    local = search_themes(interest_text)
+    if local:
+        yield from local
+        return
+    model = instruction_model("themes", THEMES_INSTRUCTION)
+    if model is None:
+        yield "Erro na configuração da IA."
+        return
+
+    themes = []
+    try:
+        for theme in iter_list_items(generate_stream(model, _themes_prompt(interest_text), schema=_LIST_SCHEMA, tag="themes")):
+            if isinstance(theme, str) and theme.strip():
+                themes.append(theme.strip())
+                yield theme.strip()
+    except Exception as e:
+        if not themes:
+            yield f"O Assistente teve um problema para criar temas. (Erro: {e})"
+        return
+    if not themes:
+        yield "O Assistente não conseguiu criar temas. Tente novamente."
+    else:
+        learn_themes(interest_text, themes)
+
 def generate_progression_ideas(theme):
     """Gera uma lista FIXA de 10 ideias de progressão com lirismo básico."""
-    model = configure_ai()
+    local = search_ideas(theme)
+    if local: return local
+    model = instruction_model("ideas", IDEAS_INSTRUCTION)
     if model is None: return ["Erro na configuração da IA."]
     
-    prompt = f"""
-    Aja como um professor de escrita criativa experiente, guiando um aluno de 11 a 13 anos que tem pouco contato com poesia.
-    O tema do poema é '{theme}'.
-    Sua tarefa é criar uma lista fixa de 10 ideias de como progredir na escrita.
-
-    **Diretrizes de Estilo (MUITO IMPORTANTE):**
-    1.  **Concretude com Lirismo Básico:** As ideias devem ser fáceis de entender e um pouco mais concretas.
-    2.  **Foco nos Sentidos:** Incentive o aluno a pensar em cheiros, sons, cores e sensações relacionadas ao tema.
-    3.  **Simplicidade:** Use um vocabulário direto e acessível, mas que desperte a imaginação.
-    4.  **Formato de Pergunta ou Comando Criativo:** As ideias devem ser perguntas ou comandos criativos.
-    5.  **NÃO ESCREVA VERSOS:** Apenas ideias.
-
-    FORMATO DA RESPOSTA: Retorne APENAS uma lista Python com 10 strings.
-    """
-    # LÓGICA DE INTERPRETAÇÃO CORRIGIDA E MAIS ROBUSTA
+    prompt = f"O tema do poema é '{theme}'."
+    # A resposta vem em JSON validado contra o esquema (com uma tentativa de conserto)
     try:
-        response = model.generate_content(prompt)
-        # Procura por qualquer coisa que se pareça com uma lista Python na resposta
-        match = re.search(r'\[.*\]', response.text, re.DOTALL)
-        if match:
-            list_str = match.group(0)
-            # A função eval() é mais flexível que json.loads() para listas no estilo Python
-            suggestions = eval(list_str)
-            if isinstance(suggestions, list) and len(suggestions) > 0:
-                return suggestions
-
+        ideas = generate(model, prompt, schema=_LIST_SCHEMA, tag="ideas")
+        learn_ideas(theme, ideas)
+        return ideas
+    except ValueError:
         # Se a extração falhar, retorna um erro claro
         return ["O Assistente não conseguiu gerar ideias. Tente novamente!"]
     except Exception as e: